@@ -0,0 +1,131 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+async def fetch(queryset):
+    """Объекты queryset, полученные через асинхронный ORM."""
+    if queryset._prefetch_related_lookups:
+        return [obj async for obj in queryset]
+    return [obj async for obj in queryset.aiterator()]
+
+
+class AsyncReadMixin:
+    """list и retrieve в виде корутин для запуска под ASGI.
+
+    Если включён ASYNC_READ_VIEWS, GET-запросы к list и retrieve
+    обрабатывают alist и aretrieve: запросы к базе в них идут через
+    асинхронный ORM, а сериализация выполняется над уже загруженными
+    объектами (случайный ленивый запрос при этом завершится ошибкой
+    SynchronousOnlyOperation, а не заблокирует цикл событий).
+    Остальные методы выполняются прежним синхронным кодом в потоке.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        action = actions.get('get')
+        if not settings.ASYNC_READ_VIEWS or action not in READ_ACTIONS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(request, action, *args, **kwargs)
+
+        async_view.cls = cls
+        async_view.initkwargs = view.initkwargs
+        async_view.actions = actions
+        # csrf_exempt в Django 4.2 не умеет оборачивать корутины.
+        async_view.csrf_exempt = True
+        return async_view
+
+    async def adispatch(self, request, action, *args, **kwargs):
+        """То же, что APIView.dispatch, для асинхронного обработчика."""
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.aauthenticate(request)
+            self.initial(request, *args, **kwargs)
+            handler = getattr(self, f'a{action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def aauthenticate(self, request):
+        """Пользователь по токену из заголовка Authorization.
+
+        Токен, который уже есть в памяти процесса, проверяется прямо в
+        цикле событий; в остальных случаях работает обычная
+        аутентификация DRF в потоке, с теми же ошибками, что и в
+        синхронных представлениях.
+        """
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'authenticate_cached', None)
+            result = authenticate and authenticate(request)
+            if result:
+                request.user, request.auth = result
+                return
+        await sync_to_async(lambda: request.user)()
+
+    async def aget_serializer_context(self):
+        return self.get_serializer_context()
+
+    async def aget_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', await self.aget_serializer_context())
+        return self.get_serializer_class()(*args, **kwargs)
+
+    async def afilter_queryset(self, queryset):
+        # Фильтры могут читать справочники из базы (например, теги).
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist, TypeError, ValueError,
+            ValidationError
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.apaginate_queryset(queryset)
+            if page is not None:
+                serializer = await self.aget_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+        serializer = await self.aget_serializer(
+            await fetch(queryset), many=True
+        )
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        serializer = await self.aget_serializer(await self.aget_object())
+        return Response(serializer.data)
@@ -0,0 +1,215 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+TOKEN_KEY = 'auth:token:{}'
+USER_KEY = 'auth:user:{}'
+GENERATION_KEY = 'auth:generation:{}'
+GENERATION_CLAIM = 'generation'
+
+
+class LocalCache:
+    """LRU в памяти процесса: не больше size записей, каждая живёт ttl
+    секунд."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+local_cache = LocalCache(
+    settings.AUTH_CACHE_LOCAL_SIZE, settings.AUTH_CACHE_LOCAL_TTL
+)
+
+
+def token_digest(key):
+    """В кэше хранится не сам токен, а его хэш."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def private_copy(value):
+    """Копия пользователя или токена DRF вместе с его пользователем.
+
+    Закэшированный экземпляр общий для всех запросов и потоков процесса,
+    поэтому запрос получает свою копию и может менять её как угодно.
+    """
+    value = copy.copy(value)
+    if isinstance(value, Token):
+        value.user = copy.copy(value.user)
+    return value
+
+
+def cached(key, load, fresh=False):
+    """Копия значения из памяти процесса, затем из общего кэша, затем
+    из load().
+
+    С fresh значение всегда берётся из load() и обновляет кэши.
+    """
+    value = None if fresh else local_cache.get(key)
+    if value is None:
+        value = None if fresh else cache.get(key)
+        if value is None:
+            value = load()
+            cache.set(key, value, settings.AUTH_CACHE_TIMEOUT)
+        local_cache.set(key, value)
+    return private_copy(value)
+
+
+def generation(user_id):
+    return cache.get(GENERATION_KEY.format(user_id), 0)
+
+
+def forget(user_id, keys=(), revoke=False):
+    """Удаляет пользователя и его токены из кэшей текущего процесса и из
+    общего кэша; revoke отзывает выданные ему подписанные токены.
+
+    Память других процессов очищается по истечении AUTH_CACHE_LOCAL_TTL.
+    """
+    cache_keys = [
+        USER_KEY.format(user_id),
+        *(TOKEN_KEY.format(token_digest(key)) for key in keys),
+    ]
+    local_cache.delete(*cache_keys)
+    cache.delete_many(cache_keys)
+    if revoke:
+        key = GENERATION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key)
+
+
+def check_active(user):
+    if not user.is_active:
+        raise AuthenticationFailed(_('User inactive or deleted.'))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен DRF, который проверяется по базе только при промахе кэша.
+
+    Изменяющие запросы всегда берут пользователя из базы.
+    """
+
+    fresh = False
+
+    def authenticate(self, request):
+        self.fresh = request.method not in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        authenticate = super().authenticate_credentials
+        token = cached(
+            TOKEN_KEY.format(token_digest(key)),
+            lambda: authenticate(key)[1],
+            self.fresh
+        )
+        check_active(token.user)
+        return token.user, token
+
+    def authenticate_cached(self, request):
+        """Пользователь и токен из памяти процесса или None.
+
+        Не обращается ни к базе, ни к общему кэшу, поэтому годится для
+        вызова прямо в цикле событий.
+        """
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            token = local_cache.get(
+                TOKEN_KEY.format(token_digest(auth[1].decode()))
+            )
+        except UnicodeError:
+            return None
+        if token is None or not token.user.is_active:
+            return None
+        token = private_copy(token)
+        return token.user, token
+
+
+def signed_token(user):
+    token = AccessToken.for_user(user)
+    token[GENERATION_CLAIM] = generation(user.pk)
+    return str(token)
+
+
+def issue_token(user):
+    """Токен для заголовка Authorization в текущем режиме AUTH_TOKEN_MODE."""
+    key = Token.objects.get_or_create(user=user)[0].key
+    return signed_token(user) if settings.AUTH_TOKEN_MODE == 'signed' else key
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    """Подписанный токен (JWT) с тем же заголовком "Token <токен>".
+
+    Подпись и срок действия проверяются без базы, отзыв - по номеру
+    поколения токенов пользователя в общем кэше. Сам пользователь
+    берётся из кэша, для изменяющих запросов - из базы. Ключи токенов
+    DRF, выданные до включения режима, по-прежнему принимаются.
+    """
+
+    def authenticate_credentials(self, key):
+        if key.count('.') != 2:
+            return super().authenticate_credentials(key)
+        try:
+            token = AccessToken(key)
+            user_id = int(token[jwt_settings.USER_ID_CLAIM])
+        except (TokenError, KeyError, ValueError):
+            raise AuthenticationFailed(_('Invalid token.'))
+        if token.get(GENERATION_CLAIM) != generation(user_id):
+            raise AuthenticationFailed(_('Invalid token.'))
+        try:
+            user = cached(
+                USER_KEY.format(user_id),
+                lambda: User.objects.using(DEFAULT_DB_ALIAS).get(pk=user_id),
+                self.fresh
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        check_active(user)
+        return user, token
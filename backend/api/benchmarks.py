@@ -0,0 +1,401 @@
+import base64
+import io
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict, namedtuple
+from types import SimpleNamespace
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from PIL import Image
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from . import urls
+from .authentication import issue_token
+from .bulk import NDJSON_CONTENT_TYPE
+
+User = get_user_model()
+
+BATCH_SIZE = 5
+PERCENTILES = (50, 95, 99)
+
+Request = namedtuple(
+    'Request',
+    ('route', 'method', 'kwargs', 'query', 'body', 'content_type', 'label',
+     'auth'),
+    defaults=('get', None, '', None, 'application/json', None, True)
+)
+
+
+def request_key(request):
+    key = f'{request.method.upper()} {request.route}'
+    return f'{key} ({request.label})' if request.label else key
+
+
+def route_names():
+    """Имена всех маршрутов api/urls.py."""
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+
+    return sorted(set(walk(urls.urlpatterns)))
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), '#49B64E').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+def benchmark_data(user, password):
+    """Объекты, на которых выполняются сценарии, или None, если данных
+    в базе недостаточно."""
+    free_recipe_ids = list(
+        Recipe.objects.exclude(author=user).exclude(
+            favorites__user=user
+        ).exclude(
+            shopping_cart__user=user
+        ).values_list('id', flat=True)[:BATCH_SIZE + 1]
+    )
+    recipe = Recipe.objects.first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    tags = list(Tag.objects.order_by('id')[:2])
+    author = User.objects.exclude(pk=user.pk).exclude(
+        subscribing__user=user
+    ).first()
+    if (
+        len(free_recipe_ids) <= BATCH_SIZE or None in (
+            recipe, ingredient, author
+        ) or not tags
+    ):
+        return None
+    return SimpleNamespace(
+        user=user,
+        password=password,
+        recipe_id=recipe.id,
+        word=recipe.name.split()[0],
+        free_recipe_ids=free_recipe_ids,
+        ingredient_id=ingredient.id,
+        prefix=ingredient.name[:2],
+        tag_ids=[tag.id for tag in tags],
+        tag_slugs=[tag.slug for tag in tags],
+        author_id=author.id,
+        image=image_data(),
+    )
+
+
+def recipe_body(data, name):
+    return {
+        'name': name,
+        'text': 'Рецепт для нагрузочного замера.',
+        'cooking_time': 30,
+        'image': data.image,
+        'tags': data.tag_ids,
+        'ingredients': [{'id': data.ingredient_id, 'amount': 100}],
+    }
+
+
+def catalog(data):
+    yield Request('api-root')
+    yield Request('ingredients-list', query=f'name={data.prefix}')
+    yield Request('ingredients-detail', kwargs={'pk': data.ingredient_id})
+    yield Request('tags-list')
+    yield Request('tags-detail', kwargs={'pk': data.tag_ids[0]})
+
+
+def recipe_pages(data):
+    yield Request('recipes-list')
+    yield Request(
+        'recipes-list',
+        query='&'.join(f'tags={slug}' for slug in data.tag_slugs),
+        label='tags'
+    )
+    yield Request(
+        'recipes-list', query=f'author={data.author_id}', label='author'
+    )
+    yield Request('recipes-list', query='is_favorited=1', label='favorites')
+    yield Request(
+        'recipes-list', query='is_in_shopping_cart=1', label='shopping cart'
+    )
+    yield Request('recipes-list', query=f'search={data.word}', label='search')
+    yield Request('recipes-detail', kwargs={'pk': data.recipe_id})
+    yield Request('recipes-feed')
+    yield Request('recipes-shopping-cart-summary')
+    yield Request('recipes-download-shopping-cart')
+    yield Request('recipes-bulk')
+
+
+def user_recipes(data):
+    recipe_id, *batch = data.free_recipe_ids
+    for route in ('recipes-favorite', 'recipes-shopping-cart'):
+        yield Request(route, 'post', kwargs={'pk': recipe_id})
+        yield Request(route, 'delete', kwargs={'pk': recipe_id})
+    for route in ('recipes-favorite-batch', 'recipes-shopping-cart-batch'):
+        yield Request(route, 'post', body={'recipes': batch})
+        yield Request(route, 'delete', body={'recipes': batch})
+
+
+def image_names(recipe_ids):
+    return list(
+        Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('image', flat=True)
+    )
+
+
+def recipe_writes(data):
+    """Создание, изменение, удаление и импорт рецепта.
+
+    Загруженные при этом фото удаляются, чтобы замеры не копили файлы.
+    """
+    images = []
+    response = yield Request(
+        'recipes-list', 'post', body=recipe_body(data, 'Замер: создание')
+    )
+    recipe_id = response.json().get('id')
+    if recipe_id is not None:
+        images += image_names([recipe_id])
+        yield Request(
+            'recipes-detail',
+            'patch',
+            kwargs={'pk': recipe_id},
+            body=recipe_body(data, 'Замер: изменение')
+        )
+        images += image_names([recipe_id])
+        yield Request('recipes-detail', 'delete', kwargs={'pk': recipe_id})
+    response = yield Request(
+        'recipes-bulk',
+        'post',
+        body=json.dumps(recipe_body(data, 'Замер: импорт')) + '\n',
+        content_type=NDJSON_CONTENT_TYPE
+    )
+    imported = [
+        result.get('id')
+        for result in map(json.loads, response.body.splitlines())
+    ]
+    images += image_names(imported)
+    Recipe.objects.filter(pk__in=imported).delete()
+    for name in set(images):
+        default_storage.delete(name)
+
+
+def users(data):
+    yield Request('users-list')
+    yield Request('users-detail', kwargs={'id': data.author_id})
+    yield Request('users-me')
+    yield Request('users-subscriptions')
+    yield Request('users-subscribe', 'post', kwargs={'id': data.author_id})
+    yield Request('users-subscribe', 'delete', kwargs={'id': data.author_id})
+
+
+def accounts(data):
+    """Регистрация, смена пароля, вход и выход.
+
+    Выход удаляет токен пользователя, поэтому сценарий выполняется
+    последним, а токен создаётся заново перед каждым проходом.
+    """
+    username = f'benchmark_{uuid.uuid4().hex[:12]}'
+    yield Request(
+        'users-list',
+        'post',
+        body={
+            'email': f'{username}@example.com',
+            'username': username,
+            'first_name': 'Замер',
+            'last_name': 'Нагрузки',
+            'password': data.password,
+        },
+        auth=False
+    )
+    User.objects.filter(username=username).delete()
+    yield Request('users-set-password', 'post', body={
+        'current_password': data.password,
+        'new_password': data.password,
+    })
+    response = yield Request(
+        'login',
+        'post',
+        body={'email': data.user.email, 'password': data.password},
+        auth=False
+    )
+    # При AUTH_TOKEN_MODE=signed смена пароля отзывает прежний токен.
+    yield Request('logout', 'post', auth=response.json().get('auth_token'))
+
+
+SCENARIOS = (
+    catalog, recipe_pages, user_recipes, recipe_writes, users, accounts
+)
+
+
+def send(client, request, token):
+    path = reverse(f'{urls.app_name}:{request.route}', kwargs=request.kwargs)
+    if request.query:
+        path = f'{path}?{request.query}'
+    if isinstance(request.auth, str):
+        token = request.auth
+    headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if request.auth else {}
+    method = getattr(client, request.method)
+    if request.body is None:
+        response = method(path, **headers)
+    else:
+        response = method(
+            path, request.body, content_type=request.content_type, **headers
+        )
+    # Потоковый ответ формируется при чтении, его время тоже входит в замер.
+    response.body = (
+        b''.join(response.streaming_content) if response.streaming
+        else response.content
+    )
+    return response
+
+
+def timed(call):
+    start = time.perf_counter()
+    response = call()
+    return response, {'ms': (time.perf_counter() - start) * 1000}
+
+
+def profiled(call):
+    """Число SQL-запросов и память, выделенная при обработке запроса.
+
+    Считается отдельным проходом: и то и другое замедляет обработку.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        response = call()
+        current, peak = tracemalloc.get_traced_memory()
+    return response, {
+        'queries': len(queries),
+        'alloc_peak_kb': (peak - before) / 1024,
+        'alloc_retained_kb': (current - before) / 1024,
+    }
+
+
+def run_scenarios(client, data, measure):
+    token = issue_token(data.user)
+    for scenario in SCENARIOS:
+        steps, response = scenario(data), None
+        while True:
+            try:
+                request = steps.send(response)
+            except StopIteration:
+                break
+            response, metrics = measure(
+                lambda: send(client, request, token)
+            )
+            yield request, response, metrics
+
+
+def percentile(values, point):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[point - 1]
+
+
+def summarize(request, results):
+    timings = results['ms']
+    summary = {
+        'route': request.route,
+        'method': request.method.upper(),
+        'requests': len(timings),
+        'statuses': dict(sorted(Counter(results['statuses']).items())),
+        **{
+            f'p{point}_ms': round(percentile(timings, point), 3)
+            for point in PERCENTILES
+        },
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+    for name in ('queries', 'alloc_peak_kb', 'alloc_retained_kb'):
+        values = results[name]
+        summary[name] = round(max(values), 1) if values else None
+    return summary
+
+
+def table_sizes():
+    return {
+        'users': User.objects.count(),
+        'recipes': Recipe.objects.count(),
+        'ingredients': Ingredient.objects.count(),
+        'ingredient_links': IngredientInRecipe.objects.count(),
+    }
+
+
+def benchmark(data, iterations, warmup=1):
+    """Прогоняет все сценарии и возвращает отчёт для сохранения в JSON.
+
+    Время ответа меряется на iterations проходах после warmup
+    разогревающих, число запросов к базе и выделенная память - на ещё
+    одном проходе.
+    """
+    client = Client(raise_request_exception=False)
+    requests = {}
+    results = defaultdict(lambda: defaultdict(list))
+    for number in range(warmup + iterations):
+        for request, response, metrics in run_scenarios(client, data, timed):
+            if number < warmup:
+                continue
+            key = request_key(request)
+            requests[key] = request
+            results[key]['ms'].append(metrics['ms'])
+            results[key]['statuses'].append(response.status_code)
+    tracemalloc.start()
+    try:
+        for request, response, metrics in run_scenarios(
+            client, data, profiled
+        ):
+            for name, value in metrics.items():
+                results[request_key(request)][name].append(value)
+    finally:
+        tracemalloc.stop()
+    covered = {request.route for request in requests.values()}
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'user': data.user.id,
+            'tables': table_sizes(),
+        },
+        'routes': {
+            key: summarize(requests[key], results[key])
+            for key in sorted(requests)
+        },
+        'not_covered': [
+            name for name in route_names() if name not in covered
+        ],
+    }
+
+
+def compare(before, after):
+    """Строки (маршрут, p50 и p95 до и после, запросы до и после) для
+    маршрутов, которые есть в обоих отчётах."""
+    for key, new in after['routes'].items():
+        old = before['routes'].get(key)
+        if old is None:
+            continue
+        yield (
+            key,
+            old['p50_ms'], new['p50_ms'],
+            old['p95_ms'], new['p95_ms'],
+            old['queries'], new['queries'],
+        )
@@ -0,0 +1,87 @@
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import RecipeReadSerializer, RecipeWriteSerializer
+from .utils import streaming_response
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson; charset=utf-8'
+
+
+def ndjson_line(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def ndjson_response(request, lines, status=200):
+    return streaming_response(
+        request, lines, status=status, content_type=NDJSON_CONTENT_TYPE
+    )
+
+
+def export_recipes(queryset, context):
+    recipes = queryset.iterator(chunk_size=settings.RECIPES_BULK_CHUNK_SIZE)
+    for recipe in recipes:
+        yield ndjson_line(RecipeReadSerializer(recipe, context=context).data)
+
+
+class RecipeImporter:
+    """Построчный импорт рецептов из NDJSON.
+
+    Каждая строка проверяется RecipeWriteSerializer, рецепты сохраняются
+    пачками по batch_size в одной транзакции (каждый в своей точке
+    сохранения), а результат по каждой строке отдаётся сразу после
+    фиксации пачки.
+    """
+
+    def __init__(self, lines, context, batch_size):
+        self.lines = lines
+        self.context = context
+        self.batch_size = batch_size
+        self.author = context['request'].user
+
+    def __iter__(self):
+        batch = []
+        for number, line in enumerate(self.lines, start=1):
+            if not line.strip():
+                continue
+            batch.append((number, line))
+            if len(batch) >= self.batch_size:
+                yield from self.save_batch(batch)
+                batch = []
+        if batch:
+            yield from self.save_batch(batch)
+
+    def save_batch(self, batch):
+        with transaction.atomic():
+            results = [self.save_line(number, line) for number, line in batch]
+        for result in results:
+            yield ndjson_line(result)
+
+    def save_line(self, number, line):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return {
+                'line': number,
+                'status': 400,
+                'errors': 'Строка должна содержать JSON-объект.',
+            }
+        serializer = RecipeWriteSerializer(data=data, context=self.context)
+        if not serializer.is_valid():
+            return {
+                'line': number, 'status': 400, 'errors': serializer.errors
+            }
+        try:
+            with transaction.atomic():
+                recipe = serializer.save(author=self.author)
+        except DatabaseError:
+            return {
+                'line': number,
+                'status': 400,
+                'errors': 'Не удалось сохранить рецепт.',
+            }
+        return {'line': number, 'status': 201, 'id': recipe.id}
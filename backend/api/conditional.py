@@ -0,0 +1,103 @@
+import hashlib
+import math
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from recipes import versions
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list и retrieve без сериализации ответа.
+
+    Наследник описывает, от чего зависит ответ, в get_list_validators и
+    get_retrieve_validators: они возвращают пару (части ETag, отметки
+    времени) или None, если условный ответ невозможен.
+    """
+
+    version_names = ()
+    per_user = False
+
+    def get_versions(self, request):
+        names = list(self.version_names)
+        if self.per_user and request.user.is_authenticated:
+            names.append(f'user:{request.user.pk}')
+        return versions.get_many(*names)
+
+    def get_list_validators(self, request):
+        stamps = self.get_versions(request)
+        return sorted(stamps.items()), stamps.values()
+
+    def get_retrieve_validators(self, request):
+        return self.get_list_validators(request)
+
+    def get_etag(self, request, validators):
+        parts, stamps = validators
+        digest = hashlib.md5(
+            repr((request.get_full_path(), request.user.pk, parts)).encode(),
+            usedforsecurity=False
+        ).hexdigest()
+        return f'W/"{digest}"', math.ceil(max(stamps, default=0))
+
+    def add_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+            if self.per_user:
+                patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def conditional(self, validators, handler, request, *args, **kwargs):
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_etag(request, validators)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    async def aconditional(self, validators, handler, request, *args,
+                           **kwargs):
+        if validators is None:
+            return await handler(request, *args, **kwargs)
+        etag, last_modified = self.get_etag(request, validators)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_list_validators(request),
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_retrieve_validators(request),
+            super().retrieve, request, *args, **kwargs
+        )
+
+    async def aget_list_validators(self, request):
+        return await sync_to_async(self.get_list_validators)(request)
+
+    async def aget_retrieve_validators(self, request):
+        return await sync_to_async(self.get_retrieve_validators)(request)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional(
+            await self.aget_list_validators(request),
+            super().alist, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional(
+            await self.aget_retrieve_validators(request),
+            super().aretrieve, request, *args, **kwargs
+        )
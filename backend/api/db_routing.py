@@ -0,0 +1,107 @@
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+STICKY_KEY = 'replica-sticky:{}'
+STICKY_COOKIE = 'replica_sticky'
+STATS_KEY = 'db-queries:{}'
+# Токены читаются с основной базы: сразу после входа реплика может
+# ещё не знать о новом токене.
+PRIMARY_MODELS = {'authtoken.token'}
+# Сколько секунд не отправлять запросы на реплику, к которой не удалось
+# подключиться.
+REPLICA_RETRY_SECONDS = 30
+
+# Состояние текущего запроса: общий объект, а не значение, чтобы
+# process_view, который под ASGI выполняется в копии контекста, мог его
+# изменить.
+request_state = ContextVar('request_state', default=None)
+unavailable = {}
+
+
+class RequestState:
+
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.read_alias = None
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def sticky_key(request):
+    """Ключ, по которому запоминается недавняя запись клиента: токен
+    или сессия. Анонимные запросы без сессии не запоминаются."""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return STICKY_KEY.format(
+        hashlib.sha256(credentials.encode()).hexdigest()[:32]
+    )
+
+
+def available(alias):
+    if unavailable.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except OperationalError:
+        unavailable[alias] = time.monotonic() + REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def choose_replica():
+    candidates = replicas()
+    random.shuffle(candidates)
+    return next(filter(available, candidates), None)
+
+
+def count_queries(aliases):
+    """Добавляет число запросов к каждой базе в общие счётчики."""
+    for alias, queries in aliases.items():
+        key = STATS_KEY.format(alias)
+        try:
+            cache.incr(key, queries)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key, queries)
+
+
+def stats():
+    keys = {alias: STATS_KEY.format(alias) for alias in settings.DATABASES}
+    found = cache.get_many(keys.values())
+    return {alias: found.get(key, 0) for alias, key in keys.items()}
+
+
+def reset_stats():
+    cache.delete_many(
+        [STATS_KEY.format(alias) for alias in settings.DATABASES]
+    )
+
+
+class ReplicaRouter:
+    """Чтение в запросах, разрешённых для реплик, - с реплики, всё
+    остальное (запись, команды, фоновые задачи) - с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if state is None or model._meta.label_lower in PRIMARY_MODELS:
+            return None
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
@@ -0,0 +1,216 @@
+import csv
+from datetime import datetime
+
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from recipes.models import ShoppingListItem
+from .utils import streaming_response
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def shopping_list(user):
+    return ShoppingListItem.objects.filter(
+        user=user, amount__gt=0
+    ).values(
+        'ingredient_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount',
+    ).order_by('ingredient__name')
+
+
+class IgnoreFormatNegotiation(DefaultContentNegotiation):
+    """Параметр ?format= выбирает формат файла, а не рендерер DRF."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ShoppingListExporter:
+    extension = None
+    content_type = None
+
+    def __init__(self, user, ingredients):
+        self.user = user
+        self.ingredients = ingredients
+        self.today = datetime.today()
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def items(self):
+        return self.ingredients.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    def title_lines(self):
+        return [
+            f'Список покупок для: {self.user.get_full_name()}',
+            '',
+            f'Дата: {self.today:%Y-%m-%d}',
+            '',
+        ]
+
+    def item_line(self, item):
+        return (
+            f'- {item["ingredient__name"]} '
+            f'({item["ingredient__measurement_unit"]})'
+            f' - {item["amount"]}'
+        )
+
+    def footer_line(self):
+        return f'Foodgram ({self.today:%Y})'
+
+    def lines(self):
+        yield from self.title_lines()
+        for item in self.items():
+            yield self.item_line(item)
+        yield ''
+        yield self.footer_line()
+
+    def response(self, request):
+        filename = f'{self.user.username}_shopping_list.{self.extension}'
+        response = streaming_response(
+            request, self, content_type=self.content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+
+class TxtExporter(ShoppingListExporter):
+    extension = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def __iter__(self):
+        lines = self.lines()
+        yield next(lines)
+        for line in lines:
+            yield f'\n{line}'
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+class CsvExporter(ShoppingListExporter):
+    extension = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def __iter__(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ['Ингредиент', 'Единица измерения', 'Количество']
+        )
+        for item in self.items():
+            yield writer.writerow([
+                item['ingredient__name'],
+                item['ingredient__measurement_unit'],
+                item['amount'],
+            ])
+
+
+CP1251_CYRILLIC = '168 /afii10023 184 /afii10071 192 ' + ' '.join(
+    f'/afii{code}'
+    for code in (
+        *range(10017, 10050), *range(10065, 10098)
+    ) if code not in (10023, 10071)
+)
+
+
+class PdfWriter:
+    """Минимальный PDF, который отдаётся клиенту постранично."""
+
+    catalog_id, pages_id, font_id = 1, 2, 3
+    page_width, page_height = 595, 842
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.next_id = 4
+        self.page_ids = []
+
+    def obj(self, obj_id, body):
+        self.offsets[obj_id] = self.offset
+        data = f'{obj_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+        self.offset += len(data)
+        return data
+
+    def start(self):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offset = len(header)
+        return header + self.obj(
+            self.catalog_id,
+            f'<< /Type /Catalog /Pages {self.pages_id} 0 R >>'.encode()
+        ) + self.obj(self.font_id, (
+            '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            f'/Differences [{CP1251_CYRILLIC}] >> >>'
+        ).encode())
+
+    @staticmethod
+    def escape(line):
+        return line.encode('cp1251', errors='replace').replace(
+            b'\\', b'\\\\'
+        ).replace(b'(', b'\\(').replace(b')', b'\\)')
+
+    def page(self, lines):
+        content = b'BT /F1 11 Tf 14 TL 50 790 Td\n' + b''.join(
+            b'(' + self.escape(line) + b") '\n" for line in lines
+        ) + b'ET'
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return self.obj(
+            content_id,
+            f'<< /Length {len(content)} >>\nstream\n'.encode()
+            + content + b'\nendstream'
+        ) + self.obj(page_id, (
+            f'<< /Type /Page /Parent {self.pages_id} 0 R '
+            f'/MediaBox [0 0 {self.page_width} {self.page_height}] '
+            f'/Resources << /Font << /F1 {self.font_id} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>'
+        ).encode())
+
+    def finish(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        data = self.obj(self.pages_id, (
+            f'<< /Type /Pages /Kids [{kids}] '
+            f'/Count {len(self.page_ids)} >>'
+        ).encode())
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        xref += [
+            f'{self.offsets[obj_id]:010d} 00000 n \n'
+            for obj_id in range(1, size)
+        ]
+        return data + ''.join(xref).encode() + (
+            f'trailer\n<< /Size {size} /Root {self.catalog_id} 0 R >>\n'
+            f'startxref\n{xref_offset}\n%%EOF\n'
+        ).encode()
+
+
+class PdfExporter(ShoppingListExporter):
+    extension = 'pdf'
+    content_type = 'application/pdf'
+    lines_per_page = 50
+
+    def __iter__(self):
+        writer = PdfWriter()
+        yield writer.start()
+        page = []
+        for line in self.lines():
+            page.append(line)
+            if len(page) == self.lines_per_page:
+                yield writer.page(page)
+                page = []
+        if page:
+            yield writer.page(page)
+        yield writer.finish()
+
+
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (TxtExporter, CsvExporter, PdfExporter)
+}
@@ -0,0 +1,324 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes import user_sets
+from recipes.models import IngredientInRecipe, Recipe, TagInRecipe
+from . import fragments
+from .serializers import file_url, rendition_urls
+
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def image_url(name, request):
+    """То же, что Base64ImageField.to_representation."""
+    return file_url(name, request) if name else None
+
+
+def short_recipe(row, request):
+    """То же, что RecipeShortSerializer."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': image_url(row['image'], request),
+        'images': rendition_urls(row['image'], row['renditions'], request),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+class FastListSerializer:
+    """Сериализатор списка (или одной строки при many=False) без полей
+    DRF.
+
+    Ответ собирается из строк values() и связанных строк, которые
+    загружаются одним запросом на связь, и поле в поле совпадает с
+    ответом обычного сериализатора.
+    """
+
+    fields = ()
+
+    def __init__(self, rows, many=False, context=None):
+        self.many = many
+        self.rows = rows if many else [rows]
+        self.context = context or {}
+        self.related = None
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.fields)
+
+    def related_querysets(self):
+        """Запросы связанных строк по именам."""
+        return {}
+
+    def load(self):
+        self.related = {
+            name: list(queryset)
+            for name, queryset in self.related_querysets().items()
+        }
+        self.prepare()
+
+    async def aload(self):
+        self.related = {
+            name: [row async for row in queryset]
+            for name, queryset in self.related_querysets().items()
+        }
+        self.prepare()
+
+    def prepare(self):
+        """Раскладывает связанные строки по строкам списка."""
+
+    def represent(self, row, request):
+        raise NotImplementedError
+
+    @property
+    def data(self):
+        if self.related is None:
+            self.load()
+        request = self.context.get('request')
+        data = [self.represent(row, request) for row in self.rows]
+        return data if self.many else next(iter(data), None)
+
+
+class FastUserSerializer(FastListSerializer):
+    """CustomUserSerializer для списка с аннотацией is_subscribed."""
+
+    fields = (*USER_FIELDS, 'is_subscribed')
+
+    def represent(self, row, request):
+        return {field: row[field] for field in self.fields}
+
+
+class FastRecipeSerializer(FastListSerializer):
+    """RecipeReadSerializer для списка; флаги берутся из user_sets."""
+
+    fields = (
+        'id', 'name', 'image', 'renditions', 'text', 'cooking_time',
+        'pub_date', 'author_id',
+        *(f'author__{field}' for field in USER_FIELDS if field != 'id'),
+    )
+
+    def related_querysets(self):
+        ids = [row['id'] for row in self.rows]
+        return {
+            'tags': TagInRecipe.objects.filter(
+                recipe_id__in=ids
+            ).order_by('tag__name').values(
+                'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+            ),
+            'ingredients': IngredientInRecipe.objects.filter(
+                recipe_id__in=ids
+            ).order_by('ingredient__name', 'id').values(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'
+            ),
+        }
+
+    def prepare(self):
+        self.sets = self.context.get('user_sets') or user_sets.EMPTY
+        self.tags = defaultdict(list)
+        for row in self.related['tags']:
+            self.tags[row['recipe_id']].append({
+                'id': row['tag_id'],
+                'name': row['tag__name'],
+                'color': row['tag__color'],
+                'slug': row['tag__slug'],
+            })
+        self.ingredients = defaultdict(list)
+        for row in self.related['ingredients']:
+            self.ingredients[row['recipe_id']].append({
+                'id': row['ingredient_id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            })
+
+    def author(self, row):
+        if row['author_id'] is None:
+            return None
+        return {
+            'email': row['author__email'],
+            'id': row['author_id'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+            'is_subscribed': False,
+        }
+
+    def fragment(self, row, request):
+        """Часть ответа, которая не зависит от пользователя."""
+        recipe_id = row['id']
+        return {
+            'id': recipe_id,
+            'tags': self.tags.get(recipe_id, []),
+            'author': self.author(row),
+            'ingredients': self.ingredients.get(recipe_id, []),
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': image_url(row['image'], request),
+            'images': rendition_urls(
+                row['image'], row['renditions'], request
+            ),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+
+    def personalize(self, recipe):
+        """Добавляет во фрагмент флаги пользователя."""
+        recipe['is_favorited'] = recipe['id'] in self.sets.favorites
+        recipe['is_in_shopping_cart'] = recipe['id'] in self.sets.cart
+        if recipe['author'] is not None:
+            recipe['author']['is_subscribed'] = (
+                recipe['author']['id'] in self.sets.subscriptions
+            )
+        return recipe
+
+    def represent(self, row, request):
+        return self.personalize(self.fragment(row, request))
+
+
+class CachedRecipeSerializer(FastRecipeSerializer):
+    """FastRecipeSerializer, который берёт фрагменты рецептов из кэша.
+
+    Из базы страница читает только id, автора и даты рецептов; флаги
+    пользователя берутся из user_sets. Недостающие фрагменты собираются
+    по основной базе: реплика может отставать от ключа фрагмента.
+    """
+
+    fields = ('id', 'author_id', 'updated_at', 'pub_date')
+
+    @classmethod
+    def values(cls, queryset):
+        return fragments.with_stamps(super().values(queryset))
+
+    def load(self):
+        keys = fragments.make_keys(self.rows)
+        found = fragments.cache().get_many(keys.values())
+        self.cached = {
+            recipe_id: found[key]
+            for recipe_id, key in keys.items() if key in found
+        }
+        missing = [
+            recipe_id for recipe_id in keys if recipe_id not in self.cached
+        ]
+        if missing:
+            built = self.build(missing)
+            fragments.cache().set_many({
+                keys[recipe_id]: fragment
+                for recipe_id, fragment in built.items()
+            })
+            self.cached.update(built)
+        # Рецепт мог быть удалён после чтения страницы.
+        self.rows = [row for row in self.rows if row['id'] in self.cached]
+        self.sets = self.context.get('user_sets') or user_sets.EMPTY
+        self.related = {}
+
+    async def aload(self):
+        await sync_to_async(self.load)()
+
+    def build(self, recipe_ids):
+        """Фрагменты с относительными ссылками на фото."""
+        serializer = FastRecipeSerializer(
+            list(FastRecipeSerializer.values(
+                Recipe.objects.using(DEFAULT_DB_ALIAS).filter(
+                    id__in=recipe_ids
+                )
+            )),
+            many=True,
+            context=self.context
+        )
+        serializer.load()
+        return {
+            row['id']: serializer.fragment(row, None)
+            for row in serializer.rows
+        }
+
+    def represent(self, row, request):
+        return self.personalize(
+            fragments.make_absolute(self.cached[row['id']], request)
+        )
+
+
+class FastSubscriptionSerializer(FastListSerializer):
+    """SubscribeSerializer для списка подписок; последние рецепты
+    авторов загружаются одним запросом с ограничением recipes_limit из
+    контекста."""
+
+    fields = (*USER_FIELDS, 'is_subscribed', 'recipes_count')
+
+    def related_querysets(self):
+        return {
+            'recipes': Recipe.objects.latest_by_author(
+                [row['id'] for row in self.rows],
+                self.context.get('recipes_limit')
+            ).values(
+                'id', 'name', 'image', 'renditions', 'cooking_time',
+                'author_id'
+            ),
+        }
+
+    def prepare(self):
+        self.recipes = defaultdict(list)
+        for recipe in self.related['recipes']:
+            self.recipes[recipe['author_id']].append(recipe)
+
+    def represent(self, row, request):
+        # SubscribeSerializer отдаёт рецепты с относительными адресами.
+        return {
+            **{field: row[field] for field in self.fields},
+            'recipes': [
+                short_recipe(recipe, None)
+                for recipe in self.recipes.get(row['id'], [])
+            ],
+        }
+
+
+class FastListMixin:
+    """Страницы списков и объекты действий из fast_serializers
+    собираются быстрыми сериализаторами, если включён FAST_SERIALIZERS."""
+
+    fast_serializers = {}
+    fast_serializer_class = None
+
+    def get_fast_serializer_class(self):
+        if not settings.FAST_SERIALIZERS:
+            return None
+        return self.fast_serializers.get(self.action)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.detail:
+            return queryset
+        self.fast_serializer_class = self.get_fast_serializer_class()
+        if self.fast_serializer_class is None:
+            return queryset
+        return self.fast_serializer_class.values(queryset)
+
+    def paginate_queryset(self, queryset):
+        self.fast_serializer_class = self.get_fast_serializer_class()
+        if self.fast_serializer_class is not None:
+            queryset = self.fast_serializer_class.values(queryset)
+        return super().paginate_queryset(queryset)
+
+    async def apaginate_queryset(self, queryset):
+        self.fast_serializer_class = self.get_fast_serializer_class()
+        if self.fast_serializer_class is not None:
+            queryset = self.fast_serializer_class.values(queryset)
+        return await super().apaginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.fast_serializer_class is None:
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.fast_serializer_class(*args, **kwargs)
+
+    async def aget_serializer(self, *args, **kwargs):
+        if self.fast_serializer_class is None:
+            return await super().aget_serializer(*args, **kwargs)
+        kwargs.setdefault('context', await self.aget_serializer_context())
+        serializer = self.fast_serializer_class(*args, **kwargs)
+        await serializer.aload()
+        return serializer
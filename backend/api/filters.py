@@ -1,13 +1,49 @@
 from django.contrib.auth import get_user_model
-from django_filters.rest_framework import FilterSet, filters
+from django.db.models import Exists, OuterRef
+from django_filters import utils
+from django_filters.rest_framework import (
+    DjangoFilterBackend, FilterSet, filters
+)
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import (
+    Favourite, Ingredient, Recipe, ShoppingCart, TagInRecipe
+)
+from recipes.search import get_search_backend
+from recipes.tag_map import tag_map
 
 User = get_user_model()
 
+TAGS_MATCH_CHOICES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги'),
+)
+
+
+def tag_choices():
+    return tag_map.choices()
+
+
+class RequestFilterBackend(DjangoFilterBackend):
+    """Параметры фильтров проверяются один раз за запрос.
+
+    Вьюсет рецептов фильтрует и запрос для ETag, и саму страницу, а
+    проверка автора в ModelChoiceFilter - это запрос к базе.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filterset = getattr(view, 'request_filterset', None)
+        if filterset is None:
+            filterset = self.get_filterset(request, queryset, view)
+            if filterset is None:
+                return queryset
+            if not filterset.is_valid() and self.raise_exception:
+                raise utils.translate_validation(filterset.errors)
+            view.request_filterset = filterset
+        return filterset.filter_queryset(queryset)
+
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='startswith')
+    name = filters.CharFilter(lookup_expr='istartswith')
 
     class Meta:
         model = Ingredient
@@ -15,29 +51,59 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES,
+        method='filter_tags_match',
     )
-
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, value):
+        tag_ids = tag_map.ids_for(value)
+        if not tag_ids:
+            return queryset
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for tag_id in tag_ids:
+                queryset = queryset.filter(Exists(TagInRecipe.objects.filter(
+                    recipe=OuterRef('pk'), tag_id=tag_id
+                )))
+            return queryset
+        return queryset.filter(Exists(TagInRecipe.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
+
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping_cart__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return get_search_backend().search(queryset, value)
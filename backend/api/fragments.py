@@ -0,0 +1,63 @@
+from django.core.cache import caches
+from django.db.models import CharField, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+from recipes.models import Version
+
+CACHE_ALIAS = 'recipe_fragments'
+# Увеличивается при изменении формата фрагмента.
+FORMAT = 2
+STAMPS = {
+    'author_stamp': Concat(
+        Value('author:'), Cast(OuterRef('author_id'), CharField())
+    ),
+    'tags_stamp': Value('tags'),
+    'ingredients_stamp': Value('ingredients'),
+}
+
+
+def cache():
+    return caches[CACHE_ALIAS]
+
+
+def with_stamps(queryset):
+    """Добавляет к строкам рецептов отметки версий их автора, тегов и
+    ингредиентов, чтобы ключи фрагментов не требовали отдельного
+    запроса."""
+    return queryset.annotate(**{
+        field: Coalesce(
+            Subquery(Version.objects.filter(name=name).values('stamp')[:1]),
+            0.0, output_field=FloatField()
+        )
+        for field, name in STAMPS.items()
+    })
+
+
+def make_keys(rows):
+    """Ключи фрагментов по id рецепта для строк values() с полями id,
+    updated_at и отметками with_stamps().
+
+    Ключ меняется вместе с рецептом (updated_at), его автором, тегами
+    и ингредиентами. Ссылки на фото во фрагменте относительные, поэтому
+    от адреса сайта ключ не зависит.
+    """
+    return {
+        row['id']: ':'.join(map(str, (
+            FORMAT, row['id'], row['updated_at'].timestamp(),
+            *(row[field] for field in STAMPS),
+        )))
+        for row in rows
+    }
+
+
+def make_absolute(fragment, request):
+    """Делает ссылки на фото во фрагменте абсолютными для request, как
+    у Base64ImageField и ImageRenditionsField."""
+    if request is None:
+        return fragment
+    if fragment['image'] is not None:
+        fragment['image'] = request.build_absolute_uri(fragment['image'])
+    for urls in fragment['images'].values():
+        for image_format, url in urls.items():
+            urls[image_format] = request.build_absolute_uri(url)
+    return fragment
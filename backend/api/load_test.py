@@ -0,0 +1,194 @@
+import http.client
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from itertools import cycle
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes.models import Ingredient, Recipe, Tag
+from . import urls
+from .authentication import issue_token
+from .benchmarks import PERCENTILES, percentile
+
+MODES = ('wsgi', 'asgi')
+READY_TIMEOUT = 30
+OK_STATUSES = (200, 304)
+
+
+def read_paths():
+    """Адреса чтения, которые ASGI-режим обслуживает асинхронно."""
+    def path(route, query='', **kwargs):
+        path = reverse(f'{urls.app_name}:{route}', kwargs=kwargs)
+        return f'{path}?{query}' if query else path
+
+    tags = list(Tag.objects.order_by('id').values_list('id', 'slug')[:2])
+    ingredient = Ingredient.objects.order_by('id').first()
+    recipe_ids = Recipe.objects.order_by('-pub_date').values_list(
+        'id', flat=True
+    )[:5]
+    paths = [
+        path('recipes-list'),
+        path('recipes-list', 'page=2'),
+        path('recipes-list', '&'.join(f'tags={slug}' for _, slug in tags)),
+        *(path('recipes-detail', pk=pk) for pk in recipe_ids),
+        path('tags-list'),
+        *(path('tags-detail', pk=pk) for pk, _ in tags),
+    ]
+    if ingredient is not None:
+        paths += [
+            path('ingredients-list', f'name={quote(ingredient.name[:2])}'),
+            path('ingredients-detail', pk=ingredient.pk),
+        ]
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, workers):
+    """gunicorn с настройками из gunicorn.conf.py в режиме mode."""
+    # Файл, а не канал: переполненный канал остановил бы сервер.
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+        ],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            'SERVER_MODE': mode,
+            'REQUEST_LOG_LEVEL': 'WARNING',
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=log,
+    )
+    server.log = log
+    return server
+
+
+def wait_ready(server, port, path):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            server.log.seek(0)
+            raise RuntimeError(server.log.read().decode()[-2000:])
+        try:
+            client = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            client.request('GET', path)
+            client.getresponse().read()
+            client.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер не ответил за {READY_TIMEOUT} с.')
+
+
+def client_loop(port, paths, headers, deadline, results):
+    """Запросы по кругу через одно keep-alive соединение до deadline."""
+    client = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for path in cycle(paths):
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        try:
+            client.request('GET', path, headers=headers)
+            response = client.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            client.close()
+            status = None
+        results.append((time.perf_counter() - start, status))
+    client.close()
+
+
+def drive(port, paths, headers, concurrency, duration):
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(port, paths[number:] + paths[:number], headers, deadline,
+                  results),
+        )
+        for number in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed, workers):
+    timings = [seconds * 1000 for seconds, _ in results] or [0]
+    rps = len(results) / elapsed
+    return {
+        'requests': len(results),
+        'errors': sum(status not in OK_STATUSES for _, status in results),
+        'rps': round(rps, 1),
+        # Воркер gunicorn занимает не больше одного ядра.
+        'rps_per_core': round(rps / min(workers, os.cpu_count() or 1), 1),
+        **{
+            f'p{point}_ms': round(percentile(timings, point), 3)
+            for point in PERCENTILES
+        },
+    }
+
+
+def load_test(modes=MODES, user=None, workers=1, concurrency=32,
+              duration=20, warmup=2):
+    """Нагружает сервер в каждом из режимов modes одними и теми же
+    запросами чтения и возвращает отчёт для сохранения в JSON.
+
+    Сервер запускается отдельным процессом на свободном порту той же
+    базы; нагрузку даёт concurrency потоков с keep-alive соединениями.
+    """
+    paths = read_paths()
+    headers = {}
+    if user is not None:
+        headers['Authorization'] = f'Token {issue_token(user)}'
+    report = {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'workers': workers,
+            'concurrency': concurrency,
+            'duration': duration,
+            'user': user and user.id,
+            'paths': paths,
+        },
+        'modes': {},
+    }
+    for mode in modes:
+        port = free_port()
+        server = start_server(mode, port, workers)
+        try:
+            wait_ready(server, port, paths[0])
+            if warmup:
+                drive(port, paths, headers, concurrency, warmup)
+            report['modes'][mode] = summarize(
+                *drive(port, paths, headers, concurrency, duration), workers
+            )
+        finally:
+            server.terminate()
+            server.wait()
+            server.log.close()
+    return report
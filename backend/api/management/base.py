@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+User = get_user_model()
+
+
+class UserCommand(BaseCommand):
+    """Команда, которая выполняет запросы от имени одного пользователя."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, от имени которого выполняются запросы '
+                 '(по умолчанию - с наибольшим числом подписок).',
+        )
+
+    def get_user(self, user_id):
+        if user_id is not None:
+            try:
+                return User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {user_id} не найден.')
+        user = User.objects.annotate(
+            subscriptions=Count('subscriber')
+        ).order_by('-subscriptions', 'id').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        return user
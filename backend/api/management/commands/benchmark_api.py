@@ -0,0 +1,102 @@
+import json
+import logging
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from api.benchmarks import benchmark, benchmark_data, compare
+from api.management.base import UserCommand
+from recipes.synthetic_data import DEFAULT_PASSWORD
+
+
+class Command(UserCommand):
+    help = (
+        'Прогоняет все маршруты API через тестовый клиент Django и '
+        'сохраняет p50/p95/p99 времени ответа, число SQL-запросов и '
+        'выделенную память в JSON. Запускать на базе после '
+        'generate_fixtures: сценарии создают и удаляют свои записи.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--password',
+            default=DEFAULT_PASSWORD,
+            help='Пароль пользователя - для входа и смены пароля.',
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='Файл отчёта.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Отчёт предыдущего замера, с которым сравнить результат.',
+        )
+
+    def read_report(self, path):
+        try:
+            return json.loads(Path(path).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать отчёт {path}: {error}')
+
+    def write_routes(self, report):
+        for key, route in report['routes'].items():
+            line = (
+                f'{key}: p50 {route["p50_ms"]} мс, p95 {route["p95_ms"]} мс, '
+                f'p99 {route["p99_ms"]} мс, запросов {route["queries"]}, '
+                f'память {route["alloc_peak_kb"]} КБ'
+            )
+            if any(int(status) >= 400 for status in route['statuses']):
+                self.stdout.write(self.style.WARNING(
+                    f'{line}, ответы {route["statuses"]}'
+                ))
+            else:
+                self.stdout.write(line)
+        if report['not_covered']:
+            self.stdout.write(
+                'Без сценария: ' + ', '.join(report['not_covered'])
+            )
+
+    def write_comparison(self, before, after):
+        self.stdout.write('\nСравнение с предыдущим замером (было -> стало):')
+        for key, *values in compare(before, after):
+            p50_before, p50_after, p95_before, p95_after = values[:4]
+            queries_before, queries_after = values[4:]
+            change = (p50_after - p50_before) / max(p50_before, 1e-6) * 100
+            style = self.style.ERROR if change > 10 else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{key}: p50 {p50_before} -> {p50_after} мс ({change:+.0f}%), '
+                f'p95 {p95_before} -> {p95_after} мс, запросов '
+                f'{queries_before} -> {queries_after}'
+            ))
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('Нужна хотя бы одна итерация.')
+        before = options['compare'] and self.read_report(options['compare'])
+        data = benchmark_data(
+            self.get_user(options['user']), options['password']
+        )
+        if data is None:
+            raise CommandError(
+                'В базе недостаточно данных, выполните generate_fixtures.'
+            )
+        # Журнал запросов из QueryMetricsMiddleware только мешал бы.
+        logging.disable(logging.WARNING)
+        try:
+            report = benchmark(data, options['iterations'], options['warmup'])
+        finally:
+            logging.disable(logging.NOTSET)
+        Path(options['output']).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        self.write_routes(report)
+        if before:
+            self.write_comparison(before, report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}.'
+        ))
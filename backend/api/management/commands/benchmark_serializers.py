@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from api.management.base import UserCommand
+from api.serializer_benchmark import PAGE_SIZES, benchmark_serializers
+
+VARIANTS = {
+    'drf': 'DRF',
+    'fast': 'быстрый',
+    'cached': 'фрагменты из кэша',
+}
+
+
+class Command(UserCommand):
+    help = (
+        'Сравнивает обычные сериализаторы DRF с JSONRenderer, быстрые '
+        'сериализаторы с ORJSONRenderer и фрагменты рецептов из кэша на '
+        'страницах рецептов и подписок: медианы времени загрузки, '
+        'сериализации и рендеринга. Проверяет, что ответы совпадают '
+        'побайтно.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--page-size', type=int, action='append', dest='page_sizes',
+            help=f'Размер страницы; по умолчанию - {PAGE_SIZES}.',
+        )
+        parser.add_argument(
+            '--output', default='benchmark_serializers.json',
+            help='Файл отчёта.',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация.')
+        report = benchmark_serializers(
+            self.get_user(options['user']), options['iterations'],
+            options['page_sizes'] or PAGE_SIZES
+        )
+        Path(options['output']).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        mismatched = False
+        for key, result in report.items():
+            drf = result['drf']
+            line = f'{key}: ' + ', '.join(
+                f'{VARIANTS[name]} {timings["total_ms"]} мс (база '
+                f'{timings["db_ms"]}, сериализация '
+                f'{timings["serialize_ms"]}, рендеринг '
+                f'{timings["render_ms"]}, '
+                f'x{drf["total_ms"] / max(timings["total_ms"], 1e-6):.1f})'
+                for name, timings in result.items() if name in VARIANTS
+            )
+            if result['identical']:
+                self.stdout.write(line)
+            else:
+                mismatched = True
+                self.stdout.write(self.style.ERROR(
+                    f'{line}, ответы различаются'
+                ))
+        if mismatched:
+            raise CommandError('Ответы быстрых сериализаторов различаются.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}.'
+        ))
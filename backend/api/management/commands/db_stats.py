@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api import db_routing
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько SQL-запросов API выполнено на основной базе '
+        'и на каждой реплике.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = db_routing.stats()
+        total = sum(stats.values())
+        for alias, queries in stats.items():
+            share = queries / total if total else 0
+            self.stdout.write(f'{alias}: запросов {queries} ({share:.1%})')
+        if options['reset']:
+            db_routing.reset_stats()
+            self.stdout.write('Счётчики обнулены.')
@@ -0,0 +1,45 @@
+from django.core.management.base import CommandError
+
+from api.management.base import UserCommand
+from api.query_plans import explain
+
+
+class Command(UserCommand):
+    help = (
+        'Выполняет EXPLAIN для самых частых запросов API и находит полные '
+        'сканирования больших таблиц. Запускать на базе с объёмом данных, '
+        'близким к боевому (например, после generate_fixtures).'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Полное сканирование таблицы меньшего размера не считается '
+                 'проблемой.',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Печатать планы целиком.',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        failed = []
+        for name, plan, scans in explain(user, options['min_rows']):
+            if scans:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: полное сканирование {", ".join(scans)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+            if options['plans'] or scans:
+                self.stdout.write(plan + '\n')
+        if failed:
+            raise CommandError(
+                f'Полные сканирования в запросах: {len(failed)}.'
+            )
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from api.load_test import MODES, load_test
+from api.management.base import UserCommand
+
+
+class Command(UserCommand):
+    help = (
+        'Запускает gunicorn в синхронном (WSGI) и асинхронном (ASGI) '
+        'режимах и нагружает каждый одними и теми же запросами чтения '
+        'рецептов, тегов и ингредиентов. Сохраняет запросы в секунду на '
+        'ядро, p50/p95/p99 и число ошибок в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--mode', choices=MODES, action='append', dest='modes',
+            help='Режим сервера; по умолчанию - оба по очереди.',
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Число одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=20,
+            help='Длительность замера в каждом режиме, с.',
+        )
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запросы без токена.',
+        )
+        parser.add_argument(
+            '--output', default='load_test.json', help='Файл отчёта.'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['workers'], options['concurrency']) < 1:
+            raise CommandError('Нужны хотя бы один воркер и один клиент.')
+        if options['duration'] <= 0:
+            raise CommandError('Длительность замера должна быть больше нуля.')
+        user = None if options['anonymous'] else self.get_user(
+            options['user']
+        )
+        try:
+            report = load_test(
+                options['modes'] or MODES,
+                user,
+                options['workers'],
+                options['concurrency'],
+                options['duration'],
+                options['warmup'],
+            )
+        except RuntimeError as error:
+            raise CommandError(f'Сервер не запустился: {error}')
+        Path(options['output']).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        for mode, result in report['modes'].items():
+            line = (
+                f'{mode}: {result["rps"]} запросов/с, '
+                f'{result["rps_per_core"]} на ядро, '
+                f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+                f'p99 {result["p99_ms"]} мс'
+            )
+            if result['errors']:
+                self.stdout.write(self.style.WARNING(
+                    f'{line}, ошибок {result["errors"]}'
+                ))
+            else:
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}.'
+        ))
@@ -0,0 +1,305 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from recipes import versions
+from . import db_routing
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+        self.aliases = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.aliases[context['connection'].alias] += 1
+            self.duration += duration
+            if duration > self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+
+def resolve_action(request, view_func):
+    actions = getattr(view_func, 'actions', None) or {}
+    return actions.get(request.method.lower(), request.method.lower())
+
+
+def resolve_endpoint(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__, None
+    action = resolve_action(request, view_func)
+    budget = getattr(view_class, 'query_budgets', {}).get(action)
+    return f'{view_class.__name__}.{action}', budget
+
+
+class QueryMetricsMiddleware:
+    """Замеряет SQL-запросы и время ответа для каждого запроса."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def wrap_connections(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.endpoint, request.query_budget = None, None
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = self.wrap_connections(recorder)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        if response.streaming:
+            return self.record_stream(
+                request, response, recorder, start, stack
+            )
+        stack.close()
+        return self.record(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        request.endpoint, request.query_budget = None, None
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # Соединения с базой у каждого потока свои, а асинхронный ORM
+        # выполняет запросы в потоке запроса, поэтому обёртки ставятся
+        # на соединения этого потока.
+        stack = await sync_to_async(self.wrap_connections)(recorder)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(stack.close)()
+            raise
+        if response.streaming:
+            return self.record_stream(
+                request, response, recorder, start, stack
+            )
+        await sync_to_async(stack.close)()
+        return self.record(request, response, recorder, start)
+
+    def record_stream(self, request, response, recorder, start, stack):
+        """Запросы потокового ответа выполняются, пока отдаётся тело,
+        поэтому они записываются, когда поток закончится.
+
+        Заголовки к этому времени уже отправлены, и X-Query-Count и
+        Server-Timing у таких ответов нет. Части потока и под ASGI
+        читаются в потоке запроса (api.utils.streaming_response), где
+        стоят обёртки соединений.
+        """
+        content = response.streaming_content
+
+        def stream():
+            try:
+                yield from content
+            finally:
+                stack.close()
+                self.record(request, response, recorder, start, True)
+
+        async def astream():
+            try:
+                async for chunk in content:
+                    yield chunk
+            finally:
+                await sync_to_async(stack.close)()
+                self.record(request, response, recorder, start, True)
+
+        response.streaming_content = (
+            astream() if response.is_async else stream()
+        )
+        return response
+
+    def record(self, request, response, recorder, start, streamed=False):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+
+        if not streamed:
+            response['X-Query-Count'] = str(recorder.count)
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+                f'db-slowest;dur={recorder.slowest_duration * 1000:.1f}, '
+                f'total;dur={wall_ms:.1f}'
+            )
+        over_budget = (
+            request.query_budget is not None
+            and recorder.count > request.query_budget
+        )
+        db_routing.count_queries(recorder.aliases)
+        # Обычный запрос пишется в DEBUG, а текст самого медленного SQL
+        # нужен только при превышении бюджета.
+        entry = {
+            'endpoint': request.endpoint or request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'queries_by_alias': dict(recorder.aliases),
+            'query_budget': request.query_budget,
+            'db_ms': round(db_ms, 2),
+            'wall_ms': round(wall_ms, 2),
+            'slowest_query_ms': round(recorder.slowest_duration * 1000, 2),
+        }
+        if over_budget:
+            entry['slowest_query'] = recorder.slowest_sql
+            logger.warning(json.dumps(entry, ensure_ascii=False))
+        else:
+            logger.debug(json.dumps(entry, ensure_ascii=False))
+        if over_budget and settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(
+                f'{request.endpoint}: {recorder.count} запросов '
+                f'при бюджете {request.query_budget}'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.endpoint, request.query_budget = resolve_endpoint(
+            request, view_func
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтение на реплики базы.
+
+    На реплику уходят только действия из replica_actions представления.
+    После запроса на запись чтение того же клиента ещё
+    REPLICA_STICKY_SECONDS секунд идёт с основной базы, чтобы он сразу
+    видел свои изменения. Клиента узнают по cookie, которую ставит ответ
+    на запись, а клиентов без cookie - по токену или сессии в общем кэше.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def is_write(request):
+        return request.method not in SAFE_METHODS and db_routing.replicas()
+
+    @staticmethod
+    def is_read(request):
+        return request.method in SAFE_METHODS and db_routing.replicas()
+
+    @staticmethod
+    def remember_write(response):
+        response.set_cookie(
+            db_routing.STICKY_COOKIE, '1',
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True, samesite='Lax'
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = db_routing.sticky_key(request)
+        token = db_routing.request_state.set(db_routing.RequestState(bool(
+            self.is_read(request) and (
+                db_routing.STICKY_COOKIE in request.COOKIES
+                or key and cache.get(key)
+            )
+        )))
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routing.request_state.reset(token)
+        if self.is_write(request):
+            self.remember_write(response)
+            if key:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        key = db_routing.sticky_key(request)
+        token = db_routing.request_state.set(db_routing.RequestState(bool(
+            self.is_read(request) and (
+                db_routing.STICKY_COOKIE in request.COOKIES
+                or key and await cache.aget(key)
+            )
+        )))
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_routing.request_state.reset(token)
+        if self.is_write(request):
+            self.remember_write(response)
+            if key:
+                await cache.aset(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = db_routing.request_state.get()
+        if (
+            state is None or state.sticky or not self.is_read(request)
+            or resolve_action(request, view_func) not in getattr(
+                getattr(view_func, 'cls', None), 'replica_actions', ()
+            )
+        ):
+            return
+        state.read_alias = db_routing.choose_replica()
+
+
+class VersionStampsMiddleware:
+    """Отметки версий читаются из базы не больше одного раза за запрос."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = versions.request_stamps.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            versions.request_stamps.reset(token)
+
+    async def __acall__(self, request):
+        token = versions.request_stamps.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            versions.request_stamps.reset(token)
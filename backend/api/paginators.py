@@ -1,7 +1,167 @@
+import base64
+import json
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным режимом курсора.
+
+    Если в запросе есть параметр cursor (в том числе пустой) или действие
+    перечислено в view.cursor_actions, страница выбирается по ключу
+    сортировки view.cursor_ordering без COUNT и OFFSET, а в ответе нет
+    поля count.
+    """
+
     page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-pk',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def is_cursor_mode(self, request, view):
+        return (
+            self.cursor_query_param in request.query_params
+            or getattr(view, 'action', None) in getattr(
+                view, 'cursor_actions', ()
+            )
+        )
+
+    def cursor_queryset(self, queryset, request, view):
+        """Запрос page_size + 1 записей после позиции курсора."""
+        self.request = request
+        self.ordering = getattr(
+            view, 'cursor_ordering', self.cursor_ordering
+        )
+        self.cursor_page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+        ordering = [
+            self.flip(field) if self.reverse else field
+            for field in self.ordering
+        ]
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.after(ordering, self.position)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.cursor_page_size + 1]
+
+    def cursor_page(self, page):
+        has_more = len(page) > self.cursor_page_size
+        page = page[:self.cursor_page_size]
+        if self.reverse:
+            page.reverse()
+        has_next = has_more if not self.reverse else self.position is not None
+        has_previous = has_more if self.reverse else self.position is not None
+        self.next_cursor = (
+            self.encode_cursor(page[-1], False)
+            if has_next and page else None
+        )
+        self.previous_cursor = (
+            self.encode_cursor(page[0], True)
+            if has_previous and page else None
+        )
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request, view)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        return self.cursor_page(
+            list(self.cursor_queryset(queryset, request, view))
+        )
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset для асинхронных представлений."""
+        self.cursor_mode = self.is_cursor_mode(request, view)
+        if self.cursor_mode:
+            return self.cursor_page([
+                obj async for obj in self.cursor_queryset(
+                    queryset, request, view
+                )
+            ])
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return [obj async for obj in self.page.object_list]
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.cursor_link(self.next_cursor),
+            'previous': self.cursor_link(self.previous_cursor),
+            'results': data,
+        })
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, position):
+        condition = Q()
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+            for previous, value in zip(ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            position.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        return base64.urlsafe_b64encode(
+            json.dumps({'p': position, 'r': reverse}).encode()
+        ).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, cursor)
@@ -0,0 +1,130 @@
+import re
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import QueryDict
+
+from recipes.feed import subscription_feed
+from recipes.models import (
+    Ingredient, IngredientInRecipe, Recipe, Tag, Version
+)
+from .exporters import shopping_list
+from .filters import IngredientFilter, RecipeFilter
+
+User = get_user_model()
+
+FULL_SCANS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(
+        r'\bSCAN (?:TABLE )?(\w+)\b'
+        r'(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE INDEX)'
+    ),
+}
+# SCAN по индексу в SQLite обходит индекс целиком. Это дёшево, только
+# если порядок индекса совпадает с ORDER BY и LIMIT останавливает обход;
+# если результат потом сортируется заново, таблица читается вся.
+SQLITE_INDEX_SCAN = re.compile(
+    r'\bSCAN (?:TABLE )?(\w+) USING (?:COVERING )?INDEX'
+)
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+TABLE_ALIAS = re.compile(r'"(\w+)" (\w+)\b')
+
+
+def recipe_list(user, query=''):
+    filterset = RecipeFilter(
+        data=QueryDict(query),
+        queryset=Recipe.objects.for_read(),
+        request=SimpleNamespace(user=user),
+    )
+    return filterset.qs[:settings.REST_FRAMEWORK['PAGE_SIZE']]
+
+
+def hot_queries(user):
+    """Запросы, которые выполняются почти на каждой странице сайта."""
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    tags_query = '&'.join(f'tags={slug}' for slug in tags)
+    recipe = Recipe.objects.order_by('-pub_date').first()
+    word = recipe.name.split()[0] if recipe else 'суп'
+    ingredient = Ingredient.objects.order_by('id').first()
+    prefix = ingredient.name[:2] if ingredient else 'са'
+    recipe_ids = list(recipe_list(user).values_list('id', flat=True))
+    authors = User.objects.filter(subscribing__user=user)[:6]
+    return [
+        ('Отметки версий', Version.objects.filter(name__in=[
+            'recipes', 'tags', 'ingredients', 'users', f'user:{user.id}'
+        ])),
+        ('Рецепты', recipe_list(user)),
+        ('Рецепты: любой из тегов', recipe_list(user, tags_query)),
+        (
+            'Рецепты: все теги',
+            recipe_list(user, f'{tags_query}&tags_match=all')
+        ),
+        ('Рецепты: автор', recipe_list(user, f'author={user.id}')),
+        ('Рецепты: избранное', recipe_list(user, 'is_favorited=1')),
+        ('Рецепты: корзина', recipe_list(user, 'is_in_shopping_cart=1')),
+        ('Рецепты: поиск', recipe_list(user, f'search={word}')),
+        (
+            'Ингредиенты рецептов страницы',
+            IngredientInRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).select_related('ingredient').order_by('ingredient__name')
+        ),
+        ('Теги рецептов страницы', Tag.objects.filter(
+            recipes__in=recipe_ids
+        )),
+        ('Список покупок', shopping_list(user)),
+        ('Подписки', authors),
+        # EXPLAIN не поддерживает фильтр по оконной функции, поэтому
+        # проверяется запрос без ограничения числа рецептов на автора.
+        (
+            'Подписки: последние рецепты',
+            Recipe.objects.latest_by_author(list(authors))
+        ),
+        ('Лента подписок', subscription_feed(user).order_by(
+            '-pub_date', '-id'
+        )[:settings.REST_FRAMEWORK['PAGE_SIZE']]),
+        ('Ингредиенты по префиксу', IngredientFilter(
+            data={'name': prefix}, queryset=Ingredient.objects.all()
+        ).qs[:10]),
+    ]
+
+
+def table_rows(table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table]
+            )
+        else:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def full_scans(queryset, plan, min_rows):
+    """Таблицы не меньше min_rows строк, которые план читает целиком."""
+    pattern = FULL_SCANS.get(connection.vendor)
+    if pattern is None:
+        return []
+    names = set(pattern.findall(plan))
+    if connection.vendor == 'sqlite' and SQLITE_SORT in plan:
+        names.update(SQLITE_INDEX_SCAN.findall(plan))
+    sql, params = queryset.query.sql_with_params()
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    tables = {aliases.get(name, name) for name in names}
+    return sorted(
+        table for table in tables
+        if table in connection.introspection.table_names()
+        and table_rows(table) >= min_rows
+    )
+
+
+def explain(user, min_rows):
+    for name, queryset in hot_queries(user):
+        plan = queryset.explain()
+        yield name, plan, full_scans(queryset, plan, min_rows)
@@ -0,0 +1,151 @@
+import statistics
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Value
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes import user_sets
+from recipes.models import Recipe
+from .fast_serializers import (
+    CachedRecipeSerializer, FastRecipeSerializer, FastSubscriptionSerializer
+)
+from .renderers import ORJSONRenderer
+from .serializers import RecipeReadSerializer, SubscribeSerializer
+
+User = get_user_model()
+
+PAGE_SIZES = (6, 50, 200)
+RECIPES_LIMIT = 3
+STAGES = ('db', 'serialize', 'render')
+
+
+def loaded(serializer):
+    serializer.load()
+    return serializer
+
+
+def recipe_variants(request, size):
+    context = {'request': request, 'user_sets': user_sets.get(request.user)}
+    queryset = Recipe.objects.for_read()
+    return {
+        'drf': (
+            lambda: list(queryset[:size]),
+            lambda page: RecipeReadSerializer(
+                page, many=True, context=context
+            ).data,
+        ),
+        'fast': (
+            lambda: loaded(FastRecipeSerializer(
+                list(FastRecipeSerializer.values(queryset)[:size]),
+                many=True, context=context
+            )),
+            lambda serializer: serializer.data,
+        ),
+        # Первый прогон заполняет кэш, замеряются тёплые страницы.
+        'cached': (
+            lambda: loaded(CachedRecipeSerializer(
+                list(CachedRecipeSerializer.values(queryset)[:size]),
+                many=True, context=context
+            )),
+            lambda serializer: serializer.data,
+        ),
+    }
+
+
+def subscription_variants(request, size):
+    queryset = User.objects.annotate(is_subscribed=Value(True)).order_by('id')
+
+    def drf_page():
+        page = list(queryset[:size])
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(page, RECIPES_LIMIT):
+            recipes_by_author[recipe.author_id].append(recipe)
+        return page, recipes_by_author
+
+    return {
+        'drf': (
+            drf_page,
+            lambda loaded_page: SubscribeSerializer(
+                loaded_page[0], many=True, context={
+                    'request': request,
+                    'recipes_by_author': loaded_page[1],
+                }
+            ).data,
+        ),
+        'fast': (
+            lambda: loaded(FastSubscriptionSerializer(
+                list(FastSubscriptionSerializer.values(queryset)[:size]),
+                many=True,
+                context={'request': request, 'recipes_limit': RECIPES_LIMIT}
+            )),
+            lambda serializer: serializer.data,
+        ),
+    }
+
+
+CASES = {
+    'recipes': recipe_variants,
+    'subscriptions': subscription_variants,
+}
+RENDERERS = {
+    'drf': JSONRenderer(),
+    'fast': ORJSONRenderer(),
+    'cached': ORJSONRenderer(),
+}
+
+
+def run(load, serialize, renderer):
+    """Время загрузки, сериализации и рендеринга одной страницы, мс."""
+    start = time.perf_counter()
+    page = load()
+    loaded_at = time.perf_counter()
+    data = serialize(page)
+    serialized_at = time.perf_counter()
+    body = renderer.render(data)
+    rendered_at = time.perf_counter()
+    timings = (
+        loaded_at - start, serialized_at - loaded_at,
+        rendered_at - serialized_at
+    )
+    return body, [timing * 1000 for timing in timings]
+
+
+def benchmark_serializers(user, iterations, page_sizes=PAGE_SIZES):
+    """Медианы времени обычных DRF-сериализаторов с JSONRenderer,
+    быстрых сериализаторов с ORJSONRenderer и, для рецептов, фрагментов
+    из кэша на страницах page_sizes.
+
+    Ответы всех вариантов сравниваются с ответом DRF побайтно.
+    """
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    report = {}
+    for case, variants_for in CASES.items():
+        for size in page_sizes:
+            variants = variants_for(request, size)
+            result = {}
+            bodies = {}
+            for name, (load, serialize) in variants.items():
+                renderer = RENDERERS[name]
+                bodies[name] = run(load, serialize, renderer)[0]
+                samples = [
+                    run(load, serialize, renderer)[1]
+                    for _ in range(iterations)
+                ]
+                result[name] = {
+                    f'{stage}_ms': round(statistics.median(values), 3)
+                    for stage, values in zip(STAGES, zip(*samples))
+                }
+                result[name]['total_ms'] = round(
+                    sum(result[name][f'{stage}_ms'] for stage in STAGES), 3
+                )
+            result['identical'] = all(
+                body == bodies['drf'] for body in bodies.values()
+            )
+            result['bytes'] = len(bodies['drf'])
+            report[f'{case} ({size})'] = result
+    return report
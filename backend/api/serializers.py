@@ -1,16 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import status, serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import IntegerField, SerializerMethodField
-from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer
 
 from users.models import Subscription
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes import shopping_lists
+from recipes.models import (
+    Ingredient, IngredientInRecipe, Recipe, Tag, TagInRecipe
+)
+from .authentication import signed_token
+from .utils import get_recipes_limit
 
 User = get_user_model()
 
@@ -24,6 +29,16 @@ class UserWithPasswordCreateSerializer(UserCreateSerializer):
         )
 
 
+class SignedTokenSerializer(serializers.Serializer):
+    """Ответ на вход при AUTH_TOKEN_MODE=signed: подписанный токен
+    вместо ключа токена DRF."""
+
+    auth_token = SerializerMethodField()
+
+    def get_auth_token(self, token):
+        return signed_token(token.user)
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
@@ -39,6 +54,11 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        user_sets = self.context.get('user_sets')
+        if user_sets is not None:
+            return obj.id in user_sets.subscriptions
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -71,18 +91,54 @@ class SubscribeSerializer(CustomUserSerializer):
         return data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.id, [])
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = Recipe.objects.latest_by_author([obj], limit)
         serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
 
+def file_url(name, request):
+    """Адрес файла в хранилище; абсолютный, если известен запрос."""
+    path = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(path)
+    return path
+
+
+def rendition_urls(image, renditions, request):
+    """Адреса уменьшенных копий фото; пока копия не готова - оригинал."""
+    original = file_url(image, request)
+    result = {}
+    for size in settings.IMAGE_RENDITIONS:
+        ready = renditions.get(size, {})
+        result[size] = {
+            image_format: file_url(ready[image_format], request)
+            if image_format in ready else original
+            for image_format in settings.IMAGE_RENDITION_FORMATS
+        }
+    return result
+
+
+class ImageRenditionsField(serializers.Field):
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return rendition_urls(
+            recipe.image.name, recipe.renditions, self.context.get('request')
+        )
+
+
 class IngredientSerializer(ModelSerializer):
     class Meta:
         model = Ingredient
@@ -100,6 +156,7 @@ class RecipeReadSerializer(ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     ingredients = SerializerMethodField()
     image = Base64ImageField()
+    images = ImageRenditionsField()
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -114,30 +171,39 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, instance):
+        user_sets = self.context.get('user_sets')
+        if user_sets is not None:
+            instance.is_favorited = instance.id in user_sets.favorites
+            instance.is_in_shopping_cart = instance.id in user_sets.cart
+            instance.is_subscribed_to_author = (
+                instance.author_id in user_sets.subscriptions
+            )
+        if instance.author is not None:
+            instance.author.is_subscribed = instance.is_subscribed_to_author
+        return super().to_representation(instance)
+
     def get_ingredients(self, obj):
-        recipe = obj
-        return recipe.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('ingredientinrecipe__amount')
-        )
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.ingredient_list.all()
+        ]
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
+        return obj.is_favorited
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shopping_cart.filter(recipe=obj).exists()
+        return obj.is_in_shopping_cart
 
 
 class IngredientInRecipeWriteSerializer(ModelSerializer):
@@ -149,9 +215,9 @@ class IngredientInRecipeWriteSerializer(ModelSerializer):
 
 
 class RecipeWriteSerializer(ModelSerializer):
-    tags = PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
+    tags = serializers.ListField(
+        child=IntegerField(min_value=1),
+        write_only=True
     )
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientInRecipeWriteSerializer(many=True)
@@ -184,68 +250,118 @@ class RecipeWriteSerializer(ModelSerializer):
             raise serializers.ValidationError(
                 'Нужно указать минимум 1 ингредиент.'
             )
-        inrgedient_id_list = [item['id'] for item in obj.get('ingredients')]
-        unique_ingredient_id_list = set(inrgedient_id_list)
-        if len(inrgedient_id_list) != len(unique_ingredient_id_list):
-            raise serializers.ValidationError(
-                'Ингредиенты должны быть уникальны.'
-            )
         return obj
 
+    @staticmethod
+    def unknown_ids(model, ids):
+        known = set(
+            model.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        return sorted(set(ids) - known)
+
     def validate_tags(self, value):
-        tags = value
-        if not tags:
-            raise ValidationError({
-                'tags': 'Выберете хотя бы один тег!'
-            })
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise ValidationError({
-                    'tags': 'Теги должны быть уникальными!'
-                })
-            tags_list.append(tag)
+        if not value:
+            raise ValidationError('Выберете хотя бы один тег!')
+        if len(set(value)) != len(value):
+            raise ValidationError('Теги должны быть уникальными!')
+        unknown = self.unknown_ids(Tag, value)
+        if unknown:
+            raise ValidationError(
+                f'Теги не найдены: {", ".join(map(str, unknown))}.'
+            )
         return value
 
-    @transaction.atomic
-    def create_ingredients_amounts(self, ingredients, recipe):
-        IngredientInRecipe.objects.bulk_create(
-            [IngredientInRecipe(
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
-                recipe=recipe,
-                amount=ingredient['amount']
-            ) for ingredient in ingredients]
+    def validate_ingredients(self, value):
+        ids = [item['id'] for item in value]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Ингредиенты должны быть уникальны.')
+        unknown = self.unknown_ids(Ingredient, ids)
+        if unknown:
+            raise ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, unknown))}.'
+            )
+        return value
+
+    @staticmethod
+    def set_tags(recipe, tag_ids, created=False):
+        current = set() if created else set(
+            TagInRecipe.objects.filter(recipe=recipe)
+            .values_list('tag_id', flat=True)
         )
+        new = set(tag_ids)
+        if current - new:
+            TagInRecipe.objects.filter(
+                recipe=recipe, tag_id__in=current - new
+            ).delete()
+        TagInRecipe.objects.bulk_create([
+            TagInRecipe(recipe=recipe, tag_id=tag_id)
+            for tag_id in new - current
+        ])
+
+    @staticmethod
+    def set_ingredients(recipe, ingredients, created=False):
+        current = {} if created else {
+            item.ingredient_id: item
+            for item in IngredientInRecipe.objects.filter(recipe=recipe)
+            .only('id', 'ingredient_id', 'amount')
+        }
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        deltas = {
+            ingredient_id: amounts.get(ingredient_id, 0) - (
+                current[ingredient_id].amount
+                if ingredient_id in current else 0
+            )
+            for ingredient_id in current.keys() | amounts.keys()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id in current.keys() & amounts.keys():
+            item = current[ingredient_id]
+            if item.amount != amounts[ingredient_id]:
+                item.amount = amounts[ingredient_id]
+                changed.append(item)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amounts[ingredient_id]
+            )
+            for ingredient_id in amounts.keys() - current.keys()
+        ])
+        if not created:
+            shopping_lists.apply_recipe_changes(recipe.id, deltas)
 
     @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-        self.create_ingredients_amounts(
-            recipe=recipe,
-            ingredients=ingredients
-        )
+        self.set_tags(recipe, tags, created=True)
+        self.set_ingredients(recipe, ingredients, created=True)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        if 'image' in validated_data:
+            instance.renditions = {}
+            instance.renditions_pending = True
+            instance.renditions_claimed_at = None
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amounts(
-            recipe=instance,
-            ingredients=ingredients
-        )
+        self.set_tags(instance, tags)
+        self.set_ingredients(instance, ingredients)
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.for_read(request.user).get(pk=instance.pk)
         return RecipeReadSerializer(
             instance,
             context=context
@@ -254,6 +370,7 @@ class RecipeWriteSerializer(ModelSerializer):
 
 class RecipeShortSerializer(ModelSerializer):
     image = Base64ImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -261,5 +378,23 @@ class RecipeShortSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.USER_RECIPES_BATCH_MAX
+    )
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    id = IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient__name')
+    measurement_unit = serializers.CharField(
+        source='ingredient__measurement_unit'
+    )
+    amount = IntegerField()
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from . import authentication
+
+User = get_user_model()
+
+
+def token_deleted(sender, instance, **kwargs):
+    # Выход через djoser удаляет токен: вместе с ним отзываются и
+    # подписанные токены пользователя.
+    transaction.on_commit(lambda: authentication.forget(
+        instance.user_id, [instance.key], revoke=True
+    ))
+
+
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is not None and set(update_fields) <= {
+        'last_login'
+    }:
+        return
+    # _password задан, пока новый пароль не сохранён, то есть и в
+    # post_save, который вызывается внутри save().
+    revoke = instance._password is not None or not instance.is_active
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    transaction.on_commit(
+        lambda: authentication.forget(instance.pk, keys, revoke)
+    )
+
+
+def user_deleted(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: authentication.forget(instance.pk, revoke=True)
+    )
+
+
+def connect_auth_cache():
+    post_delete.connect(token_deleted, sender=Token, dispatch_uid='auth')
+    post_save.connect(user_saved, sender=User, dispatch_uid='auth')
+    post_delete.connect(user_deleted, sender=User, dispatch_uid='auth')
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Запускает тесты с QUERY_BUDGET_RAISE: превышение бюджета
+    запросов роняет тест, а не только пишется в лог."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_raise = settings.QUERY_BUDGET_RAISE
+        settings.QUERY_BUDGET_RAISE = True
+
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_RAISE = self.query_budget_raise
+        super().teardown_test_environment(**kwargs)
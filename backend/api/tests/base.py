@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import local_cache
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.tag_map import tag_map
+
+User = get_user_model()
+
+
+def clear_caches():
+    """Сбрасывает общие кэши и кэши в памяти процесса."""
+    for cache in caches.all():
+        cache.clear()
+    with local_cache.lock:
+        local_cache.entries.clear()
+    tag_map.version = None
+    ingredient_index.version = None
+
+
+def create_user(name, **kwargs):
+    return User.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name=name.title(),
+        last_name='Тестов',
+        password='Passw0rd-123',
+        **kwargs
+    )
+
+
+def create_recipe(author, tags, ingredients, name='Борщ'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        image='recipes/image/test.png',
+        cooking_time=30,
+    )
+    recipe.tags.set(tags)
+    IngredientInRecipe.objects.bulk_create([
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients
+    ])
+    return recipe
+
+
+class APITestBase(APITestCase):
+    """Небольшой каталог: два автора, теги, ингредиенты и рецепты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#E26C2D', 'breakfast'),
+                ('Обед', '#49B64E', 'lunch'),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('капуста', 'картофель', 'свёкла')
+        ]
+        cls.recipes = [
+            create_recipe(
+                cls.author, cls.tags[:index % 2 + 1], cls.ingredients,
+                name=f'Рецепт {index}'
+            )
+            for index in range(8)
+        ]
+        cls.token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        clear_caches()
+
+    def login(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
@@ -0,0 +1,60 @@
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import (CachedTokenAuthentication,
+                                SignedTokenAuthentication, signed_token)
+from .base import APITestBase, User
+
+
+class AuthenticationTestsMixin:
+    """Запросы получают свои копии пользователя, изменяющие - из базы."""
+
+    def authenticate(self, method='get'):
+        request = getattr(APIRequestFactory(), method)(
+            '/api/users/me/',
+            HTTP_AUTHORIZATION=f'Token {self.get_token()}'
+        )
+        return self.authentication_class().authenticate(request)[0]
+
+    def test_requests_get_own_user_copies(self):
+        first = self.authenticate()
+        first.first_name = 'Изменено в запросе'
+        second = self.authenticate()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, self.user.first_name)
+
+    def test_unsafe_methods_load_user_from_database(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(first_name='Из базы')
+        self.assertEqual(self.authenticate().first_name, self.user.first_name)
+        self.assertEqual(self.authenticate('patch').first_name, 'Из базы')
+        self.assertEqual(self.authenticate().first_name, 'Из базы')
+
+
+class CachedAuthenticationTests(AuthenticationTestsMixin, APITestBase):
+
+    authentication_class = CachedTokenAuthentication
+
+    def get_token(self):
+        return self.token
+
+    def test_async_path_returns_copies(self):
+        self.authenticate()
+        request = APIRequestFactory().get(
+            '/api/recipes/', HTTP_AUTHORIZATION=f'Token {self.token}'
+        )
+        authenticator = self.authentication_class()
+        first = authenticator.authenticate_cached(request)
+        second = authenticator.authenticate_cached(request)
+        self.assertIsNotNone(first)
+        self.assertIsNot(first[0], second[0])
+        self.assertIsNot(first[1], second[1])
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedAuthenticationTests(AuthenticationTestsMixin, APITestBase):
+
+    authentication_class = SignedTokenAuthentication
+
+    def get_token(self):
+        return signed_token(self.user)
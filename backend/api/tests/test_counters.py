@@ -0,0 +1,45 @@
+from django.urls import reverse
+
+from recipes.models import Favourite, Recipe
+from .base import APITestBase, User, create_recipe, create_user
+
+
+class CountersSaveTests(APITestBase):
+    """Обычный save() не затирает денормализованные счётчики."""
+
+    def test_stale_user_save_keeps_counters(self):
+        stale = User.objects.get(pk=self.author.pk)
+        create_recipe(self.author, self.tags, self.ingredients)
+        stale.first_name = 'Новое имя'
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.first_name, 'Новое имя')
+        self.assertEqual(self.author.recipes_count, len(self.recipes) + 1)
+
+    def test_stale_recipe_save_keeps_counters(self):
+        stale = Recipe.objects.get(pk=self.recipes[0].pk)
+        Favourite.objects.create(user=self.user, recipe=self.recipes[0])
+        stale.name = 'Новое название'
+        stale.save()
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_explicit_update_fields_write_counters(self):
+        self.author.recipes_count = 0
+        self.author.save(update_fields=['recipes_count'])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_profile_update_keeps_counters(self):
+        self.login()
+        url = reverse('api:users-me')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        create_recipe(self.user, self.tags, self.ingredients)
+        create_user('follower').subscriber.create(author=self.user)
+        response = self.client.patch(url, {'first_name': 'Иван'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Иван')
+        self.assertEqual(self.user.recipes_count, 1)
+        self.assertEqual(self.user.subscribers_count, 1)
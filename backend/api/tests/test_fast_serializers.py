@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Exists, OuterRef, Value
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import (
+    CachedRecipeSerializer, FastRecipeSerializer, FastSubscriptionSerializer,
+    FastUserSerializer
+)
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    CustomUserSerializer, RecipeReadSerializer, SubscribeSerializer
+)
+from recipes import user_sets
+from recipes.models import Favourite, Recipe, ShoppingCart
+from users.models import Subscription
+from .base import APITestBase, create_recipe, create_user
+
+User = get_user_model()
+
+RECIPES_LIMIT = 2
+
+
+class FastSerializersTests(APITestBase):
+    """Быстрые сериализаторы отдают тот же ответ, что и обычные, поле в
+    поле и в том же порядке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_user('other')
+        for number in range(3):
+            create_recipe(cls.other, cls.tags[:1], cls.ingredients[:1],
+                          f'Суп {number}')
+        Recipe.objects.filter(pk=cls.recipes[0].pk).update(renditions={
+            'card': {'webp': 'recipes/renditions/card.webp'},
+        })
+        cls.user.subscriber.create(author=cls.author)
+        cls.user.subscriber.create(author=cls.other)
+        for recipe in cls.recipes[:3]:
+            Favourite.objects.create(user=cls.user, recipe=recipe)
+        for recipe in cls.recipes[2:5]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def make_request(self, user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return request
+
+    def users(self):
+        return (AnonymousUser(), User.objects.get(pk=self.user.pk))
+
+    def assert_same(self, fast, drf):
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(drf))
+
+    def test_recipes(self):
+        queryset = Recipe.objects.for_read()
+        for user in self.users():
+            with self.subTest(authenticated=user.is_authenticated):
+                context = {
+                    'request': self.make_request(user),
+                    'user_sets': user_sets.get(user),
+                }
+                drf = RecipeReadSerializer(
+                    list(queryset), many=True, context=context
+                ).data
+                self.assertEqual(
+                    any(recipe['is_favorited'] for recipe in drf),
+                    user.is_authenticated
+                )
+                self.assert_same(FastRecipeSerializer(
+                    list(FastRecipeSerializer.values(queryset)),
+                    many=True, context=context
+                ).data, drf)
+                # Второй проход берёт фрагменты из кэша.
+                for _ in range(2):
+                    self.assert_same(CachedRecipeSerializer(
+                        list(CachedRecipeSerializer.values(queryset)),
+                        many=True, context=context
+                    ).data, drf)
+
+    def test_users(self):
+        for user in self.users():
+            with self.subTest(authenticated=user.is_authenticated):
+                queryset = User.objects.order_by('id').annotate(
+                    is_subscribed=Exists(Subscription.objects.filter(
+                        user_id=user.pk, author=OuterRef('pk')
+                    ))
+                )
+                context = {'request': self.make_request(user)}
+                drf = CustomUserSerializer(
+                    list(queryset), many=True, context=context
+                ).data
+                self.assert_same(FastUserSerializer(
+                    list(FastUserSerializer.values(queryset)),
+                    many=True, context=context
+                ).data, drf)
+
+    def test_subscriptions(self):
+        for user in self.users():
+            with self.subTest(authenticated=user.is_authenticated):
+                queryset = User.objects.filter(
+                    subscribing__user=self.user
+                ).order_by('id').annotate(is_subscribed=Value(True))
+                request = self.make_request(user)
+                page = list(queryset)
+                recipes_by_author = defaultdict(list)
+                for recipe in Recipe.objects.latest_by_author(
+                    page, RECIPES_LIMIT
+                ):
+                    recipes_by_author[recipe.author_id].append(recipe)
+                drf = SubscribeSerializer(page, many=True, context={
+                    'request': request,
+                    'recipes_by_author': recipes_by_author,
+                }).data
+                self.assertEqual(len(drf), 2)
+                self.assert_same(FastSubscriptionSerializer(
+                    list(FastSubscriptionSerializer.values(queryset)),
+                    many=True,
+                    context={'request': request,
+                             'recipes_limit': RECIPES_LIMIT}
+                ).data, drf)
@@ -0,0 +1,151 @@
+import io
+import shutil
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from recipes.images import process_pending
+from recipes.models import Ingredient, Recipe, Tag, Version
+from .base import APITestBase, User, create_recipe
+
+
+class FragmentsTests(APITestBase):
+    """Ключ фрагмента строится только по данным базы, поэтому изменения
+    из других процессов (image_worker, команд) видны сразу."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.recipe = self.recipes[-1]
+
+    @staticmethod
+    def bump_elsewhere(name):
+        # Другой процесс меняет только базу.
+        Version.objects.update_or_create(
+            name=name, defaults={'stamp': time.time()}
+        )
+
+    def card(self):
+        return self.client.get(f'/api/recipes/{self.recipe.pk}/').json()
+
+    def listed(self):
+        return {
+            recipe['id']: recipe
+            for recipe in self.client.get('/api/recipes/').json()['results']
+        }[self.recipe.pk]
+
+    def assert_fresh(self, check):
+        check(self.card())
+        check(self.listed())
+
+    def test_renditions_from_image_worker(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+        self.recipe.image.save('dish.png', ContentFile(buffer.getvalue()))
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            renditions={}, renditions_pending=True
+        )
+        self.assert_fresh(lambda recipe: self.assertNotIn(
+            '/renditions/', recipe['images']['card']['webp']
+        ))
+        process_pending(10)
+        self.assert_fresh(lambda recipe: self.assertIn(
+            '/renditions/', recipe['images']['card']['webp']
+        ))
+
+    def test_tag_renamed_by_another_process(self):
+        self.assert_fresh(lambda recipe: None)
+        Tag.objects.filter(pk=self.tags[0].pk).update(name='Бранч')
+        # Без отметки версии фрагмент берётся из кэша.
+        self.assertEqual(self.card()['tags'][0]['name'], self.tags[0].name)
+        self.bump_elsewhere('tags')
+        self.assert_fresh(lambda recipe: self.assertEqual(
+            recipe['tags'][0]['name'], 'Бранч'
+        ))
+
+    def test_author_renamed_by_another_process(self):
+        self.assert_fresh(lambda recipe: None)
+        User.objects.filter(pk=self.author.pk).update(first_name='Пётр')
+        self.bump_elsewhere(f'author:{self.author.pk}')
+        self.assert_fresh(lambda recipe: self.assertEqual(
+            recipe['author']['first_name'], 'Пётр'
+        ))
+
+    def test_edit_removes_parts_in_bulk(self):
+        ingredients = [
+            Ingredient.objects.create(name=f'Специя {number}',
+                                      measurement_unit='г')
+            for number in range(10)
+        ]
+        recipe = create_recipe(self.user, self.tags, ingredients)
+        self.login()
+        self.assertEqual(len(self.client.get(
+            f'/api/recipes/{recipe.pk}/'
+        ).json()['ingredients']), 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(
+                    f'/api/recipes/{recipe.pk}/', {
+                        'name': recipe.name,
+                        'text': recipe.text,
+                        'cooking_time': recipe.cooking_time,
+                        'tags': [self.tags[0].pk],
+                        'ingredients': [{'id': self.ingredients[0].pk,
+                                         'amount': 5}],
+                    }, format='json'
+                )
+        self.assertEqual(response.status_code, 200, response.content)
+        sql = [query['sql'] for query in queries]
+        for table in ('recipes_ingredientinrecipe', 'recipes_taginrecipe'):
+            self.assertEqual(
+                sum(query.startswith(f'DELETE FROM "{table}"')
+                    for query in sql), 1, table
+            )
+        self.assertFalse([
+            query for query in sql
+            if query.startswith('UPDATE "recipes_recipe" SET "updated_at"')
+        ])
+        card = self.client.get(f'/api/recipes/{recipe.pk}/').json()
+        self.assertEqual(
+            [item['id'] for item in card['ingredients']],
+            [self.ingredients[0].pk]
+        )
+
+    def test_tag_changes_touch_once_per_transaction(self):
+        self.assert_fresh(lambda recipe: None)
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self.recipe.tags.clear()
+                    self.recipe.tags.add(self.tags[1])
+                    self.recipes[0].tags.remove(self.tags[0])
+        self.assertEqual(sum(
+            query['sql'].startswith('UPDATE "recipes_recipe"')
+            for query in queries
+        ), 1)
+        self.assert_fresh(lambda recipe: self.assertEqual(
+            [tag['slug'] for tag in recipe['tags']], ['lunch']
+        ))
+
+    def test_fragment_shared_between_hosts(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        first = self.client.get(url, HTTP_HOST='a.example').json()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, HTTP_HOST='b.example').json()
+        # Фрагмент из кэша: ингредиенты второй раз не читаются.
+        self.assertFalse([
+            query for query in queries
+            if 'recipes_ingredientinrecipe' in query['sql']
+        ])
+        for recipe, host in ((first, 'a.example'), (second, 'b.example')):
+            self.assertTrue(recipe['image'].startswith(f'http://{host}/'))
+            self.assertTrue(recipe['images']['card']['webp'].startswith(
+                f'http://{host}/'
+            ))
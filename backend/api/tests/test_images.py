@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from recipes import images
+from recipes.models import Recipe
+from .base import create_recipe, create_user
+
+
+class ProcessPendingTests(TransactionTestCase):
+    """Фото обрабатываются вне транзакции, в которой рецепты берутся
+    в работу."""
+
+    def setUp(self):
+        author = create_user('author')
+        self.recipes = [
+            create_recipe(author, [], [], name=f'Рецепт {index}')
+            for index in range(3)
+        ]
+
+    def test_claimed_recipes_are_skipped(self):
+        self.assertEqual(len(images.claim(2)), 2)
+        self.assertEqual(len(images.claim(2)), 1)
+        self.assertEqual(images.claim(2), [])
+
+    @override_settings(IMAGE_CLAIM_TIMEOUT=-1)
+    def test_expired_claims_return_to_queue(self):
+        self.assertEqual(len(images.claim(5)), 3)
+        self.assertEqual(len(images.claim(5)), 3)
+
+    def test_images_processed_outside_transaction(self):
+        in_transaction = []
+
+        def make_renditions(recipe):
+            in_transaction.append(connection.in_atomic_block)
+            return {'card': {}}
+
+        with mock.patch.object(images, 'make_renditions', make_renditions):
+            self.assertEqual(images.process_pending(5), 3)
+        self.assertEqual(in_transaction, [False] * 3)
+        self.assertFalse(Recipe.objects.filter(
+            renditions_pending=True
+        ).exists())
+        self.assertFalse(Recipe.objects.filter(
+            renditions_claimed_at__isnull=False
+        ).exists())
+
+    def test_replaced_image_stays_pending(self):
+        recipe = self.recipes[0]
+
+        def make_renditions(claimed):
+            if claimed.pk == recipe.pk:
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    image='recipes/image/new.png',
+                    renditions_claimed_at=None
+                )
+            return {'card': {}}
+
+        with mock.patch.object(images, 'make_renditions', make_renditions):
+            images.process_pending(5)
+        self.assertEqual(
+            [claimed.pk for claimed in images.claim(5)], [recipe.pk]
+        )
@@ -0,0 +1,27 @@
+from django.test import override_settings
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from .base import APITestBase
+
+
+class IngredientIndexTests(APITestBase):
+    """Поиск ингредиентов отдаёт сначала совпадения по префиксу и не
+    больше INGREDIENT_SEARCH_LIMIT записей."""
+
+    def search(self, name):
+        return [
+            ingredient.name for ingredient in ingredient_index.search(name)
+        ]
+
+    def test_prefix_before_contained(self):
+        Ingredient.objects.create(name='лук репчатый', measurement_unit='г')
+        Ingredient.objects.create(name='репа', measurement_unit='г')
+        self.assertEqual(self.search('реп'), ['репа', 'лук репчатый'])
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_limit(self):
+        # капуста и картофель начинаются с «ка», свёкла - нет.
+        self.assertEqual(len(self.search('к')), 2)
+        self.assertEqual(self.search('ка'), ['капуста', 'картофель'])
+        self.assertEqual(self.search('ёкл'), ['свёкла'])
@@ -0,0 +1,148 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from api.middleware import QueryBudgetExceeded
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from recipes.models import Favourite, ShoppingCart
+from users.views import SubscriptionsHandlingUserViewSet
+from .base import APITestBase, clear_caches
+
+VIEWSETS = (
+    IngredientViewSet, TagViewSet, RecipeViewSet,
+    SubscriptionsHandlingUserViewSet,
+)
+AUTHENTICATED_ONLY = {
+    ('RecipeViewSet', 'download_shopping_cart'),
+    ('RecipeViewSet', 'shopping_cart_summary'),
+    ('RecipeViewSet', 'feed'),
+    ('SubscriptionsHandlingUserViewSet', 'retrieve'),
+    ('SubscriptionsHandlingUserViewSet', 'subscriptions'),
+}
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetsTests(APITestBase):
+    """Каждое действие с бюджетом укладывается в него при холодных
+    кэшах, для анонима и для пользователя с токеном."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user.subscriber.create(author=cls.author)
+        for recipe in cls.recipes[:3]:
+            Favourite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def get_urls(self):
+        recipe, tag = self.recipes[0], self.tags[0]
+        ingredient = self.ingredients[0]
+        return {
+            'IngredientViewSet': {
+                'list': ['/api/ingredients/', '/api/ingredients/?name=ка'],
+                'retrieve': [f'/api/ingredients/{ingredient.pk}/'],
+            },
+            'TagViewSet': {
+                'list': ['/api/tags/'],
+                'retrieve': [f'/api/tags/{tag.pk}/'],
+            },
+            'RecipeViewSet': {
+                'list': [
+                    '/api/recipes/',
+                    '/api/recipes/?limit=3&page=2',
+                    '/api/recipes/?cursor=',
+                    '/api/recipes/?tags=breakfast&tags=lunch',
+                    '/api/recipes/?tags=breakfast&tags=lunch&tags_match=all',
+                    f'/api/recipes/?author={self.author.pk}',
+                    '/api/recipes/?is_favorited=1',
+                    '/api/recipes/?is_in_shopping_cart=1',
+                    '/api/recipes/?search=Рецепт',
+                ],
+                'retrieve': [f'/api/recipes/{recipe.pk}/'],
+                'download_shopping_cart': [
+                    '/api/recipes/download_shopping_cart/',
+                ],
+                'shopping_cart_summary': [
+                    '/api/recipes/shopping_cart/summary/',
+                ],
+                'feed': ['/api/recipes/feed/'],
+            },
+            'SubscriptionsHandlingUserViewSet': {
+                'list': ['/api/users/', '/api/users/?limit=1&page=2'],
+                'retrieve': [f'/api/users/{self.author.pk}/'],
+                'subscriptions': [
+                    '/api/users/subscriptions/',
+                    '/api/users/subscriptions/?recipes_limit=1',
+                ],
+            },
+        }
+
+    def fetch(self, url):
+        clear_caches()
+        response = self.client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_every_budget_has_cases(self):
+        urls = self.get_urls()
+        for viewset in VIEWSETS:
+            self.assertEqual(
+                set(urls[viewset.__name__]), set(viewset.query_budgets),
+                viewset.__name__
+            )
+
+    def test_budgets(self):
+        for authenticated in (False, True):
+            if authenticated:
+                self.login()
+            for viewset, actions in self.get_urls().items():
+                for action, urls in actions.items():
+                    if (
+                        not authenticated
+                        and (viewset, action) in AUTHENTICATED_ONLY
+                    ):
+                        continue
+                    for url in urls:
+                        with self.subTest(url=url, user=authenticated):
+                            response = self.fetch(url)
+                            self.assertEqual(response.status_code, 200)
+
+    def test_exceeded_budget_raises(self):
+        with mock.patch.object(TagViewSet, 'query_budgets', {'list': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.fetch('/api/tags/')
+
+    def test_exceeded_budget_raises_for_streams(self):
+        self.login()
+        budgets = {**RecipeViewSet.query_budgets, 'download_shopping_cart': 1}
+        with mock.patch.object(RecipeViewSet, 'query_budgets', budgets):
+            response = self.client.get('/api/recipes/download_shopping_cart/')
+            self.assertTrue(response.streaming)
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_routine_requests_log_without_sql(self):
+        with self.assertLogs('api.middleware', 'DEBUG') as logs:
+            self.fetch('/api/tags/')
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, 'DEBUG')
+        self.assertNotIn('slowest_query"', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_exceeded_budget_logs_sql(self):
+        with mock.patch.object(TagViewSet, 'query_budgets', {'list': 0}):
+            with self.assertLogs('api.middleware', 'WARNING') as logs:
+                self.fetch('/api/tags/')
+        self.assertIn('SELECT', json.loads(
+            logs.records[0].getMessage()
+        )['slowest_query'])
+
+
+class TestRunnerTests(SimpleTestCase):
+
+    def test_budget_raise_is_on(self):
+        # QUERY_BUDGET_RAISE включает TEST_RUNNER, а не override_settings.
+        self.assertTrue(settings.QUERY_BUDGET_RAISE)
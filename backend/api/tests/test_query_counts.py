@@ -0,0 +1,93 @@
+from django.test import override_settings
+
+from recipes.models import Favourite, ShoppingCart
+from .base import APITestBase, clear_caches, create_recipe, create_user
+
+# Число запросов при холодных кэшах: (аноним, пользователь с токеном).
+# None - страница только для пользователей с токеном. Страницы с
+# ?limit=1 и ?limit=50 стоят столько же, сколько страница по умолчанию.
+FAST_COUNTS = {
+    '/api/recipes/': (6, 8),
+    '/api/recipes/?limit=1': (6, 8),
+    '/api/recipes/?limit=50': (6, 8),
+    '/api/recipes/?tags=breakfast': (7, 9),
+    '/api/recipes/?author={author}': (7, 9),
+    '/api/recipes/?is_favorited=1': (6, 8),
+    '/api/recipes/{recipe}/': (6, 8),
+    '/api/recipes/feed/': (None, 6),
+    '/api/recipes/feed/?limit=1': (None, 6),
+    '/api/users/': (2, 3),
+    '/api/users/?limit=1': (2, 3),
+    '/api/users/{author}/': (None, 2),
+    '/api/users/me/': (None, 2),
+    '/api/users/subscriptions/': (None, 4),
+    '/api/users/subscriptions/?limit=1': (None, 4),
+    '/api/users/subscriptions/?recipes_limit=1': (None, 4),
+    '/api/tags/': (2, 3),
+    '/api/tags/{tag}/': (2, 3),
+    '/api/ingredients/': (2, 3),
+    '/api/ingredients/?name=ка': (2, 3),
+    '/api/ingredients/{ingredient}/': (2, 3),
+}
+# Рецепты через RecipeReadSerializer: аннотации и prefetch for_read()
+# без кэша фрагментов.
+DRF_COUNTS = {
+    **FAST_COUNTS,
+    '/api/recipes/': (5, 7),
+    '/api/recipes/?limit=1': (5, 7),
+    '/api/recipes/?limit=50': (5, 7),
+    '/api/recipes/?tags=breakfast': (6, 8),
+    '/api/recipes/?author={author}': (6, 8),
+    '/api/recipes/?is_favorited=1': (5, 7),
+    '/api/recipes/{recipe}/': (5, 7),
+    '/api/recipes/feed/': (None, 5),
+    '/api/recipes/feed/?limit=1': (None, 5),
+}
+
+
+class QueryCountTests(APITestBase):
+    """Число запросов списков и карточек не зависит от числа записей
+    на странице, авторов и рецептов у них."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(3):
+            author = create_user(f'author{index}')
+            for number in range(2):
+                create_recipe(
+                    author, cls.tags, cls.ingredients, f'Суп {number}'
+                )
+            cls.user.subscriber.create(author=author)
+        cls.user.subscriber.create(author=cls.author)
+        for recipe in cls.recipes[:3]:
+            Favourite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def format_url(self, url):
+        return url.format(
+            author=self.author.pk, recipe=self.recipes[0].pk,
+            tag=self.tags[0].pk, ingredient=self.ingredients[0].pk
+        )
+
+    def assert_counts(self, counts):
+        for index, authenticated in enumerate((False, True)):
+            if authenticated:
+                self.login()
+            for url, expected in counts.items():
+                expected = expected[index]
+                with self.subTest(url=url, authenticated=authenticated):
+                    clear_caches()
+                    with self.assertNumQueries(expected or 0):
+                        response = self.client.get(self.format_url(url))
+                    self.assertEqual(
+                        response.status_code, 401 if expected is None else 200
+                    )
+
+    @override_settings(FAST_SERIALIZERS=True)
+    def test_fast_serializers(self):
+        self.assert_counts(FAST_COUNTS)
+
+    @override_settings(FAST_SERIALIZERS=False)
+    def test_drf_serializers(self):
+        self.assert_counts(DRF_COUNTS)
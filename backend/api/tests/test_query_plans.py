@@ -0,0 +1,43 @@
+from django.db import connection
+from django.test import TestCase
+
+from api.query_plans import explain
+from recipes.models import Ingredient, Recipe
+from recipes.synthetic_data import generate
+from users.models import User
+
+USERS = 300
+RECIPES = 3000
+INGREDIENTS = 500
+# Таблицы меньше этого размера можно читать целиком: справочники тегов
+# и ингредиентов, подписки и избранное одного пользователя.
+MIN_ROWS = 1000
+
+
+class QueryPlanTests(TestCase):
+    """Планы частых запросов на синтетических данных не читают большие
+    таблицы целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(INGREDIENTS)
+        ])
+        generate(USERS, RECIPES, seed=1)
+        # Без статистики PostgreSQL считает новые таблицы пустыми.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = User.objects.filter(
+            subscriber__isnull=False, favorites__isnull=False,
+            shopping_cart__isnull=False,
+        ).distinct().order_by('id').first()
+
+    def test_dataset_is_large(self):
+        self.assertEqual(Recipe.objects.count(), RECIPES)
+        self.assertIsNotNone(self.user)
+
+    def test_no_full_scans(self):
+        for name, plan, scans in explain(self.user, MIN_ROWS):
+            with self.subTest(query=name):
+                self.assertEqual(scans, [], plan)
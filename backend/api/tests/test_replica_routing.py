@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+
+from api import db_routing
+from api.middleware import ReplicaRoutingMiddleware
+from .base import clear_caches
+
+
+@override_settings(DATABASES={
+    **settings.DATABASES, 'replica': settings.DATABASES['default']
+})
+class ReplicaStickinessTests(SimpleTestCase):
+    """После записи чтение клиента идёт с основной базы и в других
+    процессах: признак записи хранится в cookie."""
+
+    def setUp(self):
+        clear_caches()
+        self.states = []
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.states.append(db_routing.request_state.get().sticky)
+        return HttpResponse()
+
+    def test_write_sets_sticky_cookie(self):
+        response = self.middleware(RequestFactory().post('/api/recipes/'))
+        cookie = response.cookies[db_routing.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        # Другой процесс не видит кэша этого, только cookie клиента.
+        clear_caches()
+        request = RequestFactory().get('/api/recipes/')
+        request.COOKIES[db_routing.STICKY_COOKIE] = cookie.value
+        self.middleware(request)
+        self.middleware(RequestFactory().get('/api/recipes/'))
+        self.assertEqual(self.states, [False, True, False])
+
+    def test_token_client_without_cookies(self):
+        headers = {'HTTP_AUTHORIZATION': 'Token key'}
+        self.middleware(RequestFactory().post('/api/recipes/', **headers))
+        self.middleware(RequestFactory().get('/api/recipes/', **headers))
+        self.assertEqual(self.states, [False, True])
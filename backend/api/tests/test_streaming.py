@@ -0,0 +1,46 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from recipes.models import ShoppingCart
+from recipes.user_recipes import add_recipes
+from .base import APITestBase, create_recipe
+
+
+class StreamingTests(APITestBase):
+    """Под ASGI файлы и NDJSON отдаются асинхронным потоком по частям
+    с тем же телом, что и под WSGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        add_recipes(ShoppingCart, cls.user, [cls.recipes[0].pk])
+        for name in ('Щи', 'Каша'):
+            create_recipe(cls.user, cls.tags, cls.ingredients, name)
+
+    def get_urls(self):
+        return [
+            '/api/recipes/download_shopping_cart/?format=txt',
+            '/api/recipes/download_shopping_cart/?format=csv',
+            '/api/recipes/download_shopping_cart/?format=pdf',
+            f'/api/recipes/bulk/?author={self.user.pk}',
+        ]
+
+    def wsgi_body(self, url):
+        response = self.client.get(url)
+        self.assertFalse(response.is_async)
+        return b''.join(response.streaming_content)
+
+    async def asgi_chunks(self, url):
+        response = await AsyncClient().get(
+            url, headers={'Authorization': f'Token {self.token}'}
+        )
+        self.assertTrue(response.is_async)
+        return [chunk async for chunk in response.streaming_content]
+
+    def test_asgi_streams_by_chunks(self):
+        self.login()
+        for url in self.get_urls():
+            with self.subTest(url=url):
+                chunks = async_to_sync(self.asgi_chunks)(url)
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual(b''.join(chunks), self.wsgi_body(url))
@@ -0,0 +1,38 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from recipes.models import Tag
+from .base import APITestBase
+
+
+class TagMapTests(APITestBase):
+    """Новый тег сразу принимается фильтром рецептов по тегам."""
+
+    def filter_by(self, slug):
+        return self.client.get('/api/recipes/', {'tags': slug})
+
+    def test_tag_from_load_tags(self):
+        self.assertEqual(self.filter_by('dinner').status_code, 400)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'tags.json')
+            path.write_text(json.dumps([
+                {'name': 'Ужин', 'color': '#8775D2', 'slug': 'dinner'}
+            ]))
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('load_tags', str(path), stdout=StringIO())
+        self.assertEqual(self.filter_by('dinner').status_code, 200)
+
+    def test_tag_created_bypassing_models(self):
+        self.assertEqual(self.filter_by('dinner').status_code, 400)
+        Tag.objects.bulk_create(
+            [Tag(name='Ужин', color='#8775D2', slug='dinner')]
+        )
+        with override_settings(TAG_MAP_TTL=0):
+            response = self.filter_by('dinner')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from recipes import user_sets
+from recipes.models import Favourite
+from .base import APITestBase
+
+
+class UserSetsTests(APITestBase):
+    """Изменение начинает новое поколение множеств в кэше, а не
+    дописывает их."""
+
+    def test_change_starts_new_generation(self):
+        self.assertEqual(user_sets.get(self.user).favorites, frozenset())
+        generation = user_sets.generation(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favourite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertNotEqual(user_sets.generation(self.user.pk), generation)
+        self.assertEqual(
+            user_sets.get(self.user).favorites, {self.recipes[0].pk}
+        )
+
+    def test_stale_refill_is_not_read(self):
+        load = user_sets.load
+
+        def load_then_write(user_id, kinds):
+            # Запись фиксируется, пока читатель ещё не положил в кэш
+            # загруженные до неё множества.
+            try:
+                return load(user_id, kinds)
+            finally:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Favourite.objects.create(
+                        user=self.user, recipe=self.recipes[0]
+                    )
+
+        with mock.patch.object(user_sets, 'load', load_then_write):
+            self.assertEqual(user_sets.get(self.user).favorites, frozenset())
+        self.assertEqual(
+            user_sets.get(self.user).favorites, {self.recipes[0].pk}
+        )
+
+    def test_evicted_generation_is_new(self):
+        generation = user_sets.generation(self.user.pk)
+        user_sets.cache().delete(user_sets.generation_key(self.user.pk))
+        self.assertNotEqual(user_sets.generation(self.user.pk), generation)
+
+    def test_api_changes_are_visible(self):
+        self.login()
+        for recipe in self.recipes[:3]:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    f'/api/recipes/{recipe.pk}/favorite/'
+                )
+            self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+        self.assertEqual(
+            user_sets.get(self.user).favorites,
+            {recipe.pk for recipe in self.recipes[1:3]}
+        )
@@ -0,0 +1,97 @@
+import json
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import versions
+from recipes.models import Version
+from .base import APITestBase, clear_caches
+
+
+class VersionsTests(APITestBase):
+    """Отметки версий общие для процессов: они хранятся в базе."""
+
+    def test_bump_from_another_process_changes_etag(self):
+        response = self.client.get('/api/tags/')
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+            .status_code, 304
+        )
+        # Другой процесс не видит кэшей этого, только базу.
+        Version.objects.create(name='tags', stamp=1)
+        clear_caches()
+        self.assertEqual(
+            self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+            .status_code, 200
+        )
+
+    def test_load_tags_bumps_version(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'tags.json')
+            path.write_text(json.dumps([
+                {'name': 'Ужин', 'color': '#8775D2', 'slug': 'dinner'}
+            ]))
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('load_tags', str(path), stdout=StringIO())
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('dinner', {tag['slug'] for tag in response.json()})
+
+    def test_bump(self):
+        self.assertEqual(versions.get('author:1'), 0)
+        stamp = versions.bump('author:1')
+        self.assertEqual(versions.get_many('author:1', 'tags')['author:1'],
+                         stamp)
+        self.assertGreater(versions.bump('author:1'), stamp)
+
+    def test_stamps_read_once_per_request(self):
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/recipes/', {'tags': ['breakfast', 'lunch']}
+            )
+        self.assertEqual(response.status_code, 200)
+        names = [
+            name
+            for query in queries
+            if query['sql'].startswith('SELECT "recipes_version"')
+            for name in re.findall(r"'([^']+)'", query['sql'])
+        ]
+        self.assertIn('tags', names)
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_recipe_writes_change_list_etag(self):
+        recipe = self.recipes[0]
+        for write in (
+            lambda: recipe.save(),
+            lambda: recipe.tags.remove(self.tags[0]),
+            lambda: recipe.delete(),
+        ):
+            etag = self.client.get('/api/recipes/')['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            response = self.client.get(
+                '/api/recipes/', HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_one_bump_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for recipe in self.recipes:
+                recipe.save()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_cursor_page_does_not_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/', {'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
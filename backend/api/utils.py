@@ -1,23 +1,61 @@
-from datetime import datetime
-
-from django.shortcuts import HttpResponse
-
-
-def ingredients_export(self, request, ingredients):
-    user = request.user
-    filename = f'{user.username}_shopping_list.txt'
-    today = datetime.today()
-    shopping_list = (
-        f'Список покупок для: {user.get_full_name()}\n\n'
-        f'Дата: {today:%Y-%m-%d}\n\n'
-    )
-    shopping_list += '\n'.join([
-        f'- {ingredient["ingredient__name"]} '
-        f'({ingredient["ingredient__measurement_unit"]})'
-        f' - {ingredient["amount"]}'
-        for ingredient in ingredients
-    ])
-    shopping_list += f'\n\nFoodgram ({today:%Y})'
-    response = HttpResponse(shopping_list, content_type='text/plain')
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    return response
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    if limit in (None, ''):
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Укажите целое неотрицательное число.'}
+        )
+    return min(limit, settings.RECIPES_LIMIT_MAX)
+
+
+def get_bulk_batch_size(request):
+    batch_size = request.query_params.get('batch_size')
+    if batch_size in (None, ''):
+        return settings.RECIPES_BULK_BATCH_SIZE
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        raise ValidationError(
+            {'batch_size': 'Укажите целое положительное число.'}
+        )
+    return min(batch_size, settings.RECIPES_BULK_BATCH_SIZE_MAX)
+
+
+async def aiterate(content):
+    """Асинхронный итератор по синхронному: каждая часть читается
+    в потоке запроса через sync_to_async."""
+    iterator = iter(content)
+    next_chunk = sync_to_async(next)
+    done = object()
+    try:
+        while (chunk := await next_chunk(iterator, done)) is not done:
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, content, **kwargs):
+    """StreamingHttpResponse, который и под ASGI отдаётся по частям.
+
+    Синхронный поток Django 4.2 под ASGI сначала читает до конца, поэтому
+    ответу на ASGI-запрос достаётся асинхронный итератор.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = aiterate(content)
+    return StreamingHttpResponse(content, **kwargs)
@@ -1,48 +1,155 @@
-from django.db.models import Sum
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from recipes.models import (
-    Favourite, Ingredient, IngredientInRecipe,
-    Recipe, ShoppingCart, Tag
+from recipes import user_sets
+from recipes.feed import subscription_feed
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.user_recipes import add_recipes, remove_recipes
+from .async_views import AsyncReadMixin
+from .bulk import RecipeImporter, export_recipes, ndjson_response
+from .conditional import ConditionalGetMixin
+from .exporters import EXPORTERS, IgnoreFormatNegotiation, shopping_list
+from .fast_serializers import (
+    CachedRecipeSerializer, FastListMixin, FastRecipeSerializer
 )
-from .filters import IngredientFilter, RecipeFilter
+from .filters import IngredientFilter, RecipeFilter, RequestFilterBackend
 from .paginators import CustomPagination
 from .permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
 from .serializers import (
-    IngredientSerializer, RecipeReadSerializer,
-    RecipeShortSerializer, RecipeWriteSerializer,
+    IngredientSerializer, RecipeIdsSerializer, RecipeReadSerializer,
+    RecipeShortSerializer, RecipeWriteSerializer, ShoppingListItemSerializer,
     TagSerializer
 )
-from .utils import ingredients_export
+from .utils import get_bulk_batch_size
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, AsyncReadMixin,
+                        ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (RequestFilterBackend,)
     filterset_class = IngredientFilter
+    query_budgets = {'list': 3, 'retrieve': 3}
+    replica_actions = ('list', 'retrieve')
+    version_names = ('ingredients',)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.conditional(
+            self.get_list_validators(request), self.search, request, name
+        )
+
+    def search(self, request, name):
+        serializer = self.get_serializer(
+            ingredient_index.search(name), many=True
+        )
+        return Response(serializer.data)
+
+    async def alist(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return await super().alist(request, *args, **kwargs)
+        return await self.aconditional(
+            await self.aget_list_validators(request),
+            self.asearch, request, name
+        )
+
+    async def asearch(self, request, name):
+        ingredients = await sync_to_async(ingredient_index.search)(name)
+        serializer = await self.aget_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, AsyncReadMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    query_budgets = {'list': 3, 'retrieve': 3}
+    replica_actions = ('list', 'retrieve')
+    version_names = ('tags',)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, FastListMixin, AsyncReadMixin,
+                    ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly | IsAdminOrReadOnly,)
     pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (RequestFilterBackend,)
     filterset_class = RecipeFilter
+    query_budgets = {
+        'list': 9,
+        'retrieve': 8,
+        'download_shopping_cart': 3,
+        'shopping_cart_summary': 3,
+        'feed': 6,
+    }
+    replica_actions = ('list', 'retrieve')
+    version_names = ('recipes', 'tags', 'ingredients', 'users')
+    per_user = True
+    cursor_ordering = ('-pub_date', '-id')
+    cursor_actions = ('feed',)
+    fast_serializers = dict.fromkeys(
+        ('list', 'retrieve', 'feed'),
+        CachedRecipeSerializer if settings.RECIPE_FRAGMENTS
+        else FastRecipeSerializer
+    )
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read()
+        return Recipe.objects.all()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method in SAFE_METHODS:
+            context['user_sets'] = user_sets.get(self.request.user)
+        return context
+
+    async def aget_serializer_context(self):
+        return await sync_to_async(self.get_serializer_context)()
+
+    def retrieve_validators(self, updated_at, stamps):
+        if updated_at is None:
+            return None
+        return (
+            (updated_at, sorted(stamps.items())),
+            [*stamps.values(), updated_at.timestamp()]
+        )
+
+    def updated_at_query(self):
+        return Recipe.objects.filter(
+            pk=self.kwargs['pk']
+        ).values_list('updated_at', flat=True)
+
+    def get_retrieve_validators(self, request):
+        try:
+            updated_at = self.updated_at_query().first()
+        except (TypeError, ValueError):
+            return None
+        return self.retrieve_validators(
+            updated_at, self.get_versions(request)
+        )
+
+    async def aget_retrieve_validators(self, request):
+        try:
+            updated_at = await self.updated_at_query().afirst()
+        except (TypeError, ValueError):
+            return None
+        stamps = await sync_to_async(self.get_versions)(request)
+        return self.retrieve_validators(updated_at, stamps)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -52,6 +159,15 @@ class RecipeViewSet(ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        queryset = self.filter_queryset(
+            subscription_feed(request.user).for_read()
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -72,40 +188,115 @@ class RecipeViewSet(ModelViewSet):
             return self.__add_to(ShoppingCart, request.user, pk)
         return self.__delete_from(ShoppingCart, request.user, pk)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-batch'
+    )
+    def favorite_batch(self, request):
+        return self.__change_batch(Favourite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch'
+    )
+    def shopping_cart_batch(self, request):
+        return self.__change_batch(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/summary',
+        url_name='shopping-cart-summary'
+    )
+    def shopping_cart_summary(self, request):
+        serializer = ShoppingListItemSerializer(
+            shopping_list(request.user), many=True
+        )
+        return Response({
+            'recipes_count': request.user.shopping_cart.count(),
+            'ingredients': serializer.data,
+        })
+
     def __add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(Recipe, id=pk)
+        if not add_recipes(model, user, [recipe.id]):
             return Response(
                 {'errors': 'Рецепт уже добавлен!'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
         serializer = RecipeShortSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def __delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        if not pk.isdigit():
+            raise Http404
+        if remove_recipes(model, user, [int(pk)]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Рецепт уже удален!'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    def __change_batch(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = set(serializer.validated_data['recipes'])
+        if request.method == 'POST':
+            key, changed = 'added', add_recipes(
+                model, request.user, recipe_ids
+            )
+        else:
+            key, changed = 'removed', remove_recipes(
+                model, request.user, recipe_ids
+            )
+        return Response({
+            key: sorted(changed),
+            'skipped': sorted(recipe_ids - set(changed)),
+        })
+
     @action(
         detail=False,
-        permission_classes=[IsAuthenticated]
+        methods=['get', 'post'],
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatNegotiation
+    )
+    def bulk(self, request):
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            return ndjson_response(request, RecipeImporter(
+                request.stream or (), context, get_bulk_batch_size(request)
+            ))
+        author = request.query_params.get('author') or str(request.user.id)
+        if not author.isdigit():
+            raise ValidationError({'author': 'Укажите id автора.'})
+        if not request.user.is_staff and author != str(request.user.id):
+            raise PermissionDenied(
+                'Выгружать чужие рецепты может только администратор.'
+            )
+        queryset = Recipe.objects.filter(
+            author_id=author
+        ).for_read().order_by('id')
+        return ndjson_response(request, export_recipes(queryset, context))
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatNegotiation
     )
     def download_shopping_cart(self, request):
         user = request.user
+        exporter = EXPORTERS.get(request.query_params.get('format', 'txt'))
+        if exporter is None:
+            return Response(
+                {'errors': f'Доступные форматы: {", ".join(EXPORTERS)}.'},
+                status=HTTP_400_BAD_REQUEST
+            )
         if not user.shopping_cart.exists():
             return Response(status=HTTP_400_BAD_REQUEST)
-
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        return ingredients_export(self, request, ingredients)
+        return exporter(user, shopping_list(user)).response(request)
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -31,6 +32,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.QueryMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
+    'api.middleware.VersionStampsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,6 +67,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Асинхронные list и retrieve рецептов, тегов и ингредиентов. Включается
+# по умолчанию при запуске через foodgram.asgi.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+
+# Страницы списков рецептов, пользователей и подписок собираются из
+# values() без полей DRF (api.fast_serializers).
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', default='True') == 'True'
+# Общая для всех пользователей часть рецептов в списках и карточках
+# берётся из кэша recipe_fragments (api.fragments).
+RECIPE_FRAGMENTS = os.getenv('RECIPE_FRAGMENTS', default='True') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -71,7 +86,67 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='localhost'),
         'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default='60')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+# Реплики только для чтения с теми же учётными данными, что и основная
+# база: DB_REPLICA_HOSTS=host1,host2.
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+    start=1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['api.db_routing.ReplicaRouter']
+# Сколько секунд после записи чтение клиента идёт с основной базы.
+REPLICA_STICKY_SECONDS = int(
+    os.getenv('REPLICA_STICKY_SECONDS', default='5')
+)
+
+# locmem - только для разработки и тестов: у каждого воркера свой кэш.
+# При деплое .env получает redis (.github/workflows/foodgram_workflow.yml).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+    'user_sets': {
+        'BACKEND': os.getenv(
+            'USER_SETS_CACHE_BACKEND',
+            default=os.getenv(
+                'CACHE_BACKEND',
+                default='django.core.cache.backends.locmem.LocMemCache'
+            )
+        ),
+        'LOCATION': os.getenv(
+            'USER_SETS_CACHE_LOCATION',
+            default=os.getenv('CACHE_LOCATION', default='user_sets')
+        ),
+        'KEY_PREFIX': 'user_sets',
+        'TIMEOUT': 60 * 60,
+    },
+    'recipe_fragments': {
+        'BACKEND': os.getenv(
+            'RECIPE_FRAGMENTS_CACHE_BACKEND',
+            default=os.getenv(
+                'CACHE_BACKEND',
+                default='django.core.cache.backends.locmem.LocMemCache'
+            )
+        ),
+        'LOCATION': os.getenv(
+            'RECIPE_FRAGMENTS_CACHE_LOCATION',
+            default=os.getenv('CACHE_LOCATION', default='recipe_fragments')
+        ),
+        'KEY_PREFIX': 'recipe_fragments',
+        'TIMEOUT': 24 * 60 * 60,
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -107,21 +182,98 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+IMAGE_RENDITIONS = {
+    'card': (480, 360),
+    'detail': (960, 720),
+    'retina': (1920, 1440),
+}
+IMAGE_RENDITION_FORMATS = ('webp', 'jpeg')
+IMAGE_RENDITION_QUALITY = 82
+# Через сколько секунд фото, взятое в обработку, снова попадает в очередь.
+IMAGE_CLAIM_TIMEOUT = 10 * 60
+
+# cached - токены DRF, которые проверяются по кэшу и только при промахе
+# по базе; signed - подписанные токены без обращения к базе.
+AUTH_TOKEN_MODE = os.getenv('AUTH_TOKEN_MODE', default='cached')
+AUTHENTICATION_CLASSES = {
+    'cached': 'api.authentication.CachedTokenAuthentication',
+    'signed': 'api.authentication.SignedTokenAuthentication',
+}
+AUTH_CACHE_LOCAL_SIZE = 10000
+AUTH_CACHE_LOCAL_TTL = 30
+AUTH_CACHE_TIMEOUT = 5 * 60
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('SIGNED_TOKEN_LIFETIME_DAYS', default='14'))
+    ),
+    'AUTH_HEADER_TYPES': ('Token',),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        AUTHENTICATION_CLASSES[AUTH_TOKEN_MODE],
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'PAGE_SIZE': 6,
 }
 
+RECIPES_LIMIT_MAX = 50
+
+RECIPES_BULK_BATCH_SIZE = 50
+RECIPES_BULK_BATCH_SIZE_MAX = 500
+RECIPES_BULK_CHUNK_SIZE = 200
+
+USER_RECIPES_BATCH_MAX = 200
+
+FEED_FAN_OUT_THRESHOLD = 1000
+FEED_BACKFILL_LIMIT = 100
+
+INGREDIENT_INDEX_TTL = 60 * 60
+# Сколько ингредиентов отдаёт поиск по ?name=.
+INGREDIENT_SEARCH_LIMIT = 50
+TAG_MAP_TTL = 60
+
+# query_budgets вьюсетов - число запросов при холодных кэшах; в тестах
+# превышение бюджета - ошибка (его включает TEST_RUNNER), иначе -
+# предупреждение в логе.
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = 'api.test_runner.QueryBudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Строка о каждом запросе - DEBUG, превышение бюджета запросов -
+        # WARNING.
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 DJOSER = {
     'SERIALIZERS': {
         'user_create': 'api.serializers.UserWithPasswordCreateSerializer',
         'user': 'api.serializers.CustomUserSerializer',
         'current_user': 'api.serializers.CustomUserSerializer',
+        **(
+            {'token': 'api.serializers.SignedTokenSerializer'}
+            if AUTH_TOKEN_MODE == 'signed' else {}
+        ),
     },
 
     'PERMISSIONS': {
@@ -0,0 +1,12 @@
+import os
+
+# SERVER_MODE=asgi запускает приложение через uvicorn-воркеры с
+# асинхронными обработчиками чтения, по умолчанию - синхронный WSGI.
+if os.getenv('SERVER_MODE', default='wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default='1'))
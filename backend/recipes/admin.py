@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.admin import display
+from django.db import transaction
 
+from . import shopping_lists
 from .models import (
     Favourite, Ingredient, IngredientInRecipe,
     Recipe, ShoppingCart, Tag, TagInRecipe
@@ -15,9 +17,12 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author', 'tags')
     empty_value_display = '-пусто-'
 
-    @display(description='Количество в избранных')
+    @display(
+        description='Количество в избранных',
+        ordering='favorites_count'
+    )
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -55,6 +60,23 @@ class FavouriteAdmin(admin.ModelAdmin):
 class IngredientInRecipe(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        old = type(obj).objects.get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        shopping_lists.apply_link_change(old, obj)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        shopping_lists.apply_link_change(obj, None)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            shopping_lists.apply_link_change(obj, None)
+        super().delete_queryset(request, queryset)
+
 
 @admin.register(TagInRecipe)
 class TagInRecipe(admin.ModelAdmin):
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from .signals import (
+            connect_counters, connect_feed, connect_shopping_lists,
+            connect_user_sets, connect_versions
+        )
+        connect_counters()
+        connect_versions()
+        connect_user_sets()
+        connect_shopping_lists()
+        connect_feed()
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription, User
+
+from .models import Favourite, Recipe, ShoppingCart
+
+Counter = namedtuple('Counter', ('source', 'relation', 'target', 'field'))
+
+COUNTERS = (
+    Counter(Favourite, 'recipe', Recipe, 'favorites_count'),
+    Counter(ShoppingCart, 'recipe', Recipe, 'in_carts_count'),
+    Counter(Recipe, 'author', User, 'recipes_count'),
+    Counter(Subscription, 'author', User, 'subscribers_count'),
+)
+
+
+def change_counter(counter, instance, delta):
+    target_id = getattr(instance, f'{counter.relation}_id')
+    if target_id is None:
+        return
+    change_counters(counter, [target_id], delta)
+
+
+def change_counters(counter, target_ids, delta):
+    if not target_ids:
+        return
+    counter.target.objects.filter(pk__in=target_ids).update(
+        **{counter.field: Greatest(F(counter.field) + delta, 0)}
+    )
+
+
+def counter_for(source):
+    return next(counter for counter in COUNTERS if counter.source is source)
+
+
+def actual_count(counter):
+    return Coalesce(Subquery(
+        counter.source.objects.filter(
+            **{counter.relation: OuterRef('pk')}
+        ).order_by().values(counter.relation).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile(counter, fix=True):
+    drifted = counter.target.objects.alias(
+        actual=actual_count(counter)
+    ).exclude(**{counter.field: F('actual')})
+    drifted_count = drifted.count()
+    if fix and drifted_count:
+        counter.target.objects.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{counter.field: actual_count(counter)})
+    return drifted_count
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from users.models import Subscription
+
+from .models import Recipe, TimelineEntry
+
+FAN_OUT_SQL = (
+    'INSERT INTO {timeline} (user_id, recipe_id) '
+    'SELECT user_id, %s FROM {subscriptions} WHERE author_id = %s '
+    'ON CONFLICT (user_id, recipe_id) DO NOTHING'
+)
+
+BACKFILL_SQL = (
+    'INSERT INTO {timeline} (user_id, recipe_id) '
+    'SELECT %s, id FROM {recipes} WHERE author_id = %s AND fanned_out '
+    'ORDER BY pub_date DESC, id DESC LIMIT %s '
+    'ON CONFLICT (user_id, recipe_id) DO NOTHING'
+)
+
+
+def execute(sql, params):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(
+                timeline=quote(TimelineEntry._meta.db_table),
+                subscriptions=quote(Subscription._meta.db_table),
+                recipes=quote(Recipe._meta.db_table),
+            ),
+            params
+        )
+
+
+def should_fan_out(author):
+    return (
+        author is not None
+        and author.subscribers_count <= settings.FEED_FAN_OUT_THRESHOLD
+    )
+
+
+def fan_out(recipe):
+    execute(FAN_OUT_SQL, [recipe.pk, recipe.author_id])
+
+
+def backfill(user_id, author_id):
+    execute(BACKFILL_SQL, [user_id, author_id, settings.FEED_BACKFILL_LIMIT])
+
+
+def forget(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def subscription_feed(user):
+    """Рецепты авторов, на которых подписан пользователь.
+
+    Рецепты авторов с небольшим числом подписчиков при публикации
+    рассылаются в ленты (TimelineEntry), остальные (fanned_out=False)
+    подмешиваются при чтении по подпискам.
+    """
+    return Recipe.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(
+            fanned_out=False,
+            author_id__in=Subscription.objects.filter(
+                user=user
+            ).values('author_id')
+        )
+    )
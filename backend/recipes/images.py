@@ -0,0 +1,102 @@
+import io
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import versions
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def rendition_name(recipe, size, image_format):
+    return f'recipes/renditions/{recipe.pk}/{size}.{image_format}'
+
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        PIL_FORMATS[image_format],
+        quality=settings.IMAGE_RENDITION_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def make_renditions(recipe):
+    with recipe.image.open('rb') as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original = original.convert('RGB')
+    renditions = {}
+    for size, box in settings.IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        renditions[size] = {}
+        for image_format in settings.IMAGE_RENDITION_FORMATS:
+            name = rendition_name(recipe, size, image_format)
+            default_storage.delete(name)
+            renditions[size][image_format] = default_storage.save(
+                name, ContentFile(encode(image, image_format))
+            )
+    return renditions
+
+
+def claim(batch_size):
+    """Берёт в обработку до batch_size рецептов с необработанными фото.
+
+    Транзакция короткая: строки только отмечаются временем взятия, и
+    другие воркеры пропускают их IMAGE_CLAIM_TIMEOUT секунд - потом
+    рецепты упавшего воркера снова попадают в очередь.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        recipes = list(
+            Recipe.objects.filter(
+                Q(renditions_claimed_at__isnull=True)
+                | Q(renditions_claimed_at__lt=now - timedelta(
+                    seconds=settings.IMAGE_CLAIM_TIMEOUT
+                )),
+                renditions_pending=True,
+            )
+            .select_for_update(skip_locked=True)
+            .only('pk', 'image')[:batch_size]
+        )
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).update(renditions_claimed_at=now)
+    return recipes
+
+
+def process_pending(batch_size):
+    recipes = claim(batch_size)
+    updated = 0
+    for recipe in recipes:
+        try:
+            renditions = make_renditions(recipe)
+        except Exception:
+            logger.exception('Не удалось обработать фото рецепта %s',
+                             recipe.pk)
+            renditions = {}
+        # Если фото заменили во время обработки, копии не записываются:
+        # новое фото снова ждёт обработки.
+        updated += Recipe.objects.filter(
+            pk=recipe.pk, image=recipe.image.name
+        ).update(
+            renditions=renditions,
+            renditions_pending=False,
+            renditions_claimed_at=None,
+            updated_at=timezone.now(),
+        )
+    if updated:
+        versions.bump('recipes')
+    return len(recipes)
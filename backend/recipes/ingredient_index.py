@@ -0,0 +1,83 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from itertools import chain
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from . import versions
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Регистронезависимый поиск ингредиентов по префиксу в памяти."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.built_at = 0.0
+        # Ключи и записи меняются одним присваиванием: поиск без
+        # блокировки не должен видеть ключи одной сборки и записи другой.
+        self.index = ([], [])
+
+    def is_stale(self, version):
+        return (
+            version != self.version
+            or time.monotonic() - self.built_at
+            > settings.INGREDIENT_INDEX_TTL
+        )
+
+    def build(self, version):
+        # Индекс строится по версии, поэтому с основной базы: реплика
+        # может ещё не содержать изменение, которое её подняло.
+        ingredients = Ingredient.objects.using(DEFAULT_DB_ALIAS).annotate(
+            usage=Count('ingredientinrecipe')
+        ).order_by()
+        entries = sorted(
+            (ingredient.name.lower(), -ingredient.usage, ingredient.id,
+             ingredient)
+            for ingredient in ingredients
+        )
+        self.index = ([entry[0] for entry in entries], entries)
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        version = versions.get('ingredients')
+        if self.is_stale(version):
+            with self.lock:
+                if self.is_stale(version):
+                    self.build(version)
+
+    def search(self, query):
+        """Не больше INGREDIENT_SEARCH_LIMIT ингредиентов: сначала
+        начинающиеся с query, затем содержащие его."""
+        self.ensure_fresh()
+        query = query.lower()
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        keys, entries = self.index
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(entries) and entries[end][0].startswith(query):
+            end += 1
+
+        def rank(entry):
+            return entry[1], entry[0], entry[2]
+
+        found = heapq.nsmallest(limit, entries[start:end], key=rank)
+        if len(found) < limit:
+            found += heapq.nsmallest(
+                limit - len(found),
+                (
+                    entry for entry in chain(entries[:start], entries[end:])
+                    if query in entry[0]
+                ),
+                key=rank
+            )
+        return [entry[3] for entry in found]
+
+
+ingredient_index = IngredientIndex()
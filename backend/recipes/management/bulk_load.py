@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+
+class BulkLoadCommand(BaseCommand):
+    """Идемпотентная пакетная загрузка справочника из CSV или JSON."""
+
+    model = None
+    fields = ()
+    unique_fields = ()
+    default_batch_size = 1000
+
+    @property
+    def update_fields(self):
+        return [
+            field for field in self.fields
+            if field not in self.unique_fields
+        ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv, .json или .jsonl')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=self.default_batch_size,
+            help='Количество строк в одном INSERT.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.',
+        )
+
+    def read_csv(self, file):
+        for row in csv.reader(file):
+            if row and row != list(self.fields):
+                yield dict(zip(self.fields, row))
+
+    def read_json(self, file):
+        for item in json.load(file):
+            yield item.get('fields', item)
+
+    def read_jsonl(self, file):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    def read_rows(self, path):
+        reader = getattr(self, f'read_{path.suffix.lstrip(".")}', None)
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        seen = set()
+        with path.open(encoding='utf-8') as file:
+            for item in reader(file):
+                row = tuple(str(item[field]).strip() for field in self.fields)
+                key = tuple(
+                    row[self.fields.index(field)]
+                    for field in self.unique_fields
+                )
+                if key not in seen:
+                    seen.add(key)
+                    yield row
+
+    @staticmethod
+    def batches(rows, size):
+        rows = iter(rows)
+        while batch := list(islice(rows, size)):
+            yield batch
+
+    def load_bulk_create(self, rows, batch_size):
+        options = {'ignore_conflicts': True}
+        if self.update_fields:
+            options = {
+                'update_conflicts': True,
+                'unique_fields': self.unique_fields,
+                'update_fields': self.update_fields,
+            }
+        total = 0
+        for batch in self.batches(rows, batch_size):
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.fields, row))) for row in batch],
+                **options
+            )
+            total += len(batch)
+        return total
+
+    def load_copy(self, rows, batch_size):
+        table = self.model._meta.db_table
+        columns = ', '.join(self.fields)
+        conflict = 'DO NOTHING'
+        if self.update_fields:
+            conflict = 'DO UPDATE SET ' + ', '.join(
+                f'{field} = EXCLUDED.{field}' for field in self.update_fields
+            )
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE bulk_load ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            for batch in self.batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.cursor.copy_expert(
+                    f'COPY bulk_load ({columns}) FROM STDIN WITH CSV', buffer
+                )
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM bulk_load '
+                f'ON CONFLICT ({", ".join(self.unique_fields)}) {conflict}'
+            )
+        return total
+
+    def can_copy(self, options):
+        return (
+            not options['no_copy']
+            and connection.vendor == 'postgresql'
+            and connection.Database.__name__ == 'psycopg2'
+        )
+
+    def after_load(self):
+        pass
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        rows = self.read_rows(path)
+        start = time.perf_counter()
+        with transaction.atomic():
+            if self.can_copy(options):
+                method, total = 'COPY', self.load_copy(
+                    rows, options['batch_size']
+                )
+            else:
+                method, total = 'bulk_create', self.load_bulk_create(
+                    rows, options['batch_size']
+                )
+            self.after_load()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.model._meta.verbose_name_plural}: обработано {total} '
+            f'строк за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} '
+            f'строк/с, {method}), в таблице '
+            f'{self.model.objects.count()} записей.'
+        ))
@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Ingredient
+from recipes.synthetic_data import DEFAULT_PASSWORD, generate
+
+INGREDIENT_FILES = (
+    settings.BASE_DIR / 'ingredients.json',
+    settings.BASE_DIR.parent / 'data' / 'ingredients.json',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, рецепты, подписки, избранное '
+        'и корзины с неравномерной популярностью - для нагрузочных '
+        'замеров на SQLite или локальном PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Одинаковый seed на пустой базе даёт одинаковые данные.',
+        )
+        parser.add_argument(
+            '--password',
+            default=DEFAULT_PASSWORD,
+            help='Пароль всех созданных пользователей.',
+        )
+        parser.add_argument(
+            '--ingredients',
+            help='Справочник ингредиентов, если в базе их ещё нет '
+                 '(по умолчанию - ingredients.json проекта).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT.',
+        )
+
+    def load_ingredients(self, path):
+        if path is None:
+            path = next(
+                (path for path in INGREDIENT_FILES if path.exists()), None
+            )
+        if path is None or not Path(path).exists():
+            raise CommandError(
+                'Не найден справочник ингредиентов, укажите --ingredients.'
+            )
+        call_command('load_ingredients', str(path), stdout=self.stdout)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 0:
+            raise CommandError(
+                'Нужен хотя бы один пользователь и неотрицательное число '
+                'рецептов.'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if not Ingredient.objects.exists():
+            self.load_ingredients(options['ingredients'])
+        start = time.perf_counter()
+        with transaction.atomic():
+            created = generate(
+                options['users'],
+                options['recipes'],
+                seed=options['seed'],
+                password=options['password'],
+                batch_size=options['batch_size'],
+            )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{name}: {count}' for name, count in created.items())
+            + f' - за {elapsed:.1f} с.'
+        ))
@@ -0,0 +1,15 @@
+from django.db import transaction
+
+from recipes import versions
+from recipes.management.bulk_load import BulkLoadCommand
+from recipes.models import Ingredient
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает ингредиенты из CSV или JSON.'
+    model = Ingredient
+    fields = ('name', 'measurement_unit')
+    unique_fields = ('name', 'measurement_unit')
+
+    def after_load(self):
+        transaction.on_commit(lambda: versions.bump('ingredients'))
@@ -0,0 +1,15 @@
+from django.db import transaction
+
+from recipes import versions
+from recipes.management.bulk_load import BulkLoadCommand
+from recipes.models import Tag
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает теги из CSV или JSON.'
+    model = Tag
+    fields = ('name', 'color', 'slug')
+    unique_fields = ('slug',)
+
+    def after_load(self):
+        transaction.on_commit(lambda: versions.bump('tags'))
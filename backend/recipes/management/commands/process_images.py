@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Фоновый обработчик фото рецептов: готовит уменьшенные копии '
+        'в WebP и JPEG.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь один раз и завершиться.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5,
+            help='Сколько рецептов брать из очереди за раз.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Пауза в секундах, если очередь пуста.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_pending(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {total}'
+        ))
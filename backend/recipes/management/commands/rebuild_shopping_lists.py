@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_lists import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Сверяет списки покупок с корзинами и пересобирает разошедшиеся.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        drifted = rebuild(fix=fix)
+        if not drifted:
+            self.stdout.write('Списки покупок: расхождений нет')
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок: пересобрано пользователей - {drifted}'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Списки покупок: расхождения у пользователей - {drifted}'
+            ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Находит и исправляет расхождения в денормализованных счётчиках.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        for counter in COUNTERS:
+            with transaction.atomic():
+                drifted = reconcile(counter, fix=fix)
+            name = f'{counter.target.__name__}.{counter.field}'
+            if not drifted:
+                self.stdout.write(f'{name}: расхождений нет')
+            elif fix:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: исправлено записей - {drifted}'
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: найдено расхождений - {drifted}'
+                ))
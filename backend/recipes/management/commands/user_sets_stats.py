@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from recipes import user_sets
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает попадания и промахи кэша избранного, корзины и подписок '
+        'пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = user_sets.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {ratio:.1%}'
+        )
+        if options['reset']:
+            user_sets.reset_stats()
+            self.stdout.write('Счётчики обнулены.')
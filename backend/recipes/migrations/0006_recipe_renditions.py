@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Уменьшенные копии фото'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_pending',
+            field=models.BooleanField(db_index=True, default=True, editable=False, verbose_name='Фото ожидает обработки'),
+        ),
+    ]
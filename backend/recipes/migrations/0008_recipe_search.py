@@ -0,0 +1,210 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = """
+ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector;
+
+CREATE FUNCTION recipes_recipe_search_document(
+    recipe_id bigint, recipe_name text, recipe_text text
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('russian', coalesce(recipe_name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(recipe_text, '')), 'B')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_ingredientinrecipe link
+            JOIN recipes_ingredient ingredient
+                ON ingredient.id = link.ingredient_id
+            WHERE link.recipe_id = recipes_recipe_search_document.recipe_id
+        ), '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION recipes_recipe_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := recipes_recipe_search_document(
+        NEW.id, NEW.name, NEW.text
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_update
+    BEFORE INSERT OR UPDATE OF name, text, search_vector ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_update();
+
+CREATE FUNCTION recipes_recipe_search_touch_new() RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe SET search_vector = NULL
+    WHERE id IN (SELECT DISTINCT recipe_id FROM changed_rows);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_ingredientinrecipe_search_insert
+    AFTER INSERT ON recipes_ingredientinrecipe
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_touch_new();
+
+CREATE TRIGGER recipes_ingredientinrecipe_search_update
+    AFTER UPDATE ON recipes_ingredientinrecipe
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_touch_new();
+
+CREATE TRIGGER recipes_ingredientinrecipe_search_delete
+    AFTER DELETE ON recipes_ingredientinrecipe
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_touch_new();
+
+CREATE FUNCTION recipes_ingredient_search_rename() RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe SET search_vector = NULL
+    WHERE id IN (
+        SELECT recipe_id FROM recipes_ingredientinrecipe
+        WHERE ingredient_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_ingredient_search_rename
+    AFTER UPDATE OF name ON recipes_ingredient
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION recipes_ingredient_search_rename();
+
+UPDATE recipes_recipe SET search_vector = NULL;
+
+CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING GIN (search_vector);
+"""
+
+POSTGRESQL_REVERSE = """
+DROP TRIGGER recipes_ingredient_search_rename ON recipes_ingredient;
+DROP TRIGGER recipes_ingredientinrecipe_search_delete
+    ON recipes_ingredientinrecipe;
+DROP TRIGGER recipes_ingredientinrecipe_search_update
+    ON recipes_ingredientinrecipe;
+DROP TRIGGER recipes_ingredientinrecipe_search_insert
+    ON recipes_ingredientinrecipe;
+DROP TRIGGER recipes_recipe_search_update ON recipes_recipe;
+DROP FUNCTION recipes_ingredient_search_rename();
+DROP FUNCTION recipes_recipe_search_touch_new();
+DROP FUNCTION recipes_recipe_search_update();
+DROP FUNCTION recipes_recipe_search_document(bigint, text, text);
+ALTER TABLE recipes_recipe DROP COLUMN search_vector;
+"""
+
+SQLITE_DOCUMENT = """
+    SELECT {recipe}.id, {recipe}.name, {recipe}.text, coalesce((
+        SELECT group_concat(ingredient.name, ' ')
+        FROM recipes_ingredientinrecipe link
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = link.ingredient_id
+        WHERE link.recipe_id = {recipe}.id
+    ), '')
+"""
+
+SQLITE_REFRESH = (
+    'DELETE FROM recipes_recipe_fts WHERE rowid = {recipe_id};'
+    'INSERT INTO recipes_recipe_fts (rowid, name, text, ingredients) '
+    + SQLITE_DOCUMENT.format(recipe='recipes_recipe')
+    + ' FROM recipes_recipe WHERE recipes_recipe.id = {recipe_id};'
+)
+
+SQLITE_RECIPES_WITH_INGREDIENT = (
+    '(SELECT recipe_id FROM recipes_ingredientinrecipe '
+    'WHERE ingredient_id = NEW.id)'
+)
+
+SQLITE_FILL = (
+    'INSERT INTO recipes_recipe_fts (rowid, name, text, ingredients) '
+    + SQLITE_DOCUMENT.format(recipe='recipes_recipe')
+    + ' FROM recipes_recipe'
+)
+
+# SQLite пересоздаёт таблицу при многих изменениях схемы (AddField и
+# т.п.), и триггеры при этом теряются или мешают переименованию. Такие
+# миграции recipes_recipe оборачивают изменение в SQLITE_DROP_TRIGGERS и
+# SQLITE_TRIGGERS с SQLITE_REFILL.
+SQLITE_TRIGGERS = [
+    'CREATE TRIGGER recipes_recipe_fts_insert AFTER INSERT ON recipes_recipe '
+    'BEGIN ' + SQLITE_REFRESH.format(recipe_id='NEW.id') + ' END',
+    'CREATE TRIGGER recipes_recipe_fts_update '
+    'AFTER UPDATE OF name, text ON recipes_recipe '
+    'BEGIN ' + SQLITE_REFRESH.format(recipe_id='NEW.id') + ' END',
+    'CREATE TRIGGER recipes_recipe_fts_delete AFTER DELETE ON recipes_recipe '
+    'BEGIN DELETE FROM recipes_recipe_fts WHERE rowid = OLD.id; END',
+    'CREATE TRIGGER recipes_ingredientinrecipe_fts_insert '
+    'AFTER INSERT ON recipes_ingredientinrecipe '
+    'BEGIN ' + SQLITE_REFRESH.format(recipe_id='NEW.recipe_id') + ' END',
+    'CREATE TRIGGER recipes_ingredientinrecipe_fts_update '
+    'AFTER UPDATE ON recipes_ingredientinrecipe '
+    'BEGIN ' + SQLITE_REFRESH.format(recipe_id='NEW.recipe_id') + ' END',
+    'CREATE TRIGGER recipes_ingredientinrecipe_fts_delete '
+    'AFTER DELETE ON recipes_ingredientinrecipe '
+    'BEGIN ' + SQLITE_REFRESH.format(recipe_id='OLD.recipe_id') + ' END',
+    'CREATE TRIGGER recipes_ingredient_fts_rename '
+    'AFTER UPDATE OF name ON recipes_ingredient '
+    'BEGIN DELETE FROM recipes_recipe_fts WHERE rowid IN '
+    + SQLITE_RECIPES_WITH_INGREDIENT + ';'
+    'INSERT INTO recipes_recipe_fts (rowid, name, text, ingredients) '
+    + SQLITE_DOCUMENT.format(recipe='recipes_recipe')
+    + ' FROM recipes_recipe WHERE recipes_recipe.id IN '
+    + SQLITE_RECIPES_WITH_INGREDIENT + '; END',
+]
+
+SQLITE_DROP_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS recipes_ingredient_fts_rename',
+    'DROP TRIGGER IF EXISTS recipes_ingredientinrecipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_ingredientinrecipe_fts_update',
+    'DROP TRIGGER IF EXISTS recipes_ingredientinrecipe_fts_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+]
+
+SQLITE_REFILL = ['DELETE FROM recipes_recipe_fts', SQLITE_FILL]
+
+SQLITE_FORWARD = [
+    'CREATE VIRTUAL TABLE recipes_recipe_fts '
+    'USING fts5(name, text, ingredients)',
+    SQLITE_FILL,
+    *SQLITE_TRIGGERS,
+]
+
+SQLITE_REVERSE = [
+    *SQLITE_DROP_TRIGGERS,
+    'DROP TABLE recipes_recipe_fts',
+]
+
+
+def run(statements):
+
+    def migrate(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor)
+        if vendor_statements is None:
+            return
+        if isinstance(vendor_statements, str):
+            vendor_statements = [vendor_statements]
+        for statement in vendor_statements:
+            schema_editor.execute(statement, params=None)
+
+    return migrate
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({
+                'postgresql': POSTGRESQL_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            run({
+                'postgresql': POSTGRESQL_REVERSE,
+                'sqlite': SQLITE_REVERSE,
+            }),
+        ),
+    ]
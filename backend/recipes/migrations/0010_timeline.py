@@ -0,0 +1,48 @@
+# Generated by Django 4.2.1 on 2026-10-18 01:47
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+search = import_module('recipes.migrations.0008_recipe_search')
+
+RESTORE_TRIGGERS = search.run(
+    {'sqlite': search.SQLITE_TRIGGERS + search.SQLITE_REFILL}
+)
+DROP_TRIGGERS = search.run({'sqlite': search.SQLITE_DROP_TRIGGERS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.RunPython(DROP_TRIGGERS, RESTORE_TRIGGERS),
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан в ленты подписчиков'),
+        ),
+        migrations.RunPython(RESTORE_TRIGGERS, DROP_TRIGGERS),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.1 on 2026-10-18 01:50
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+run = import_module('recipes.migrations.0008_recipe_search').run
+
+# Префиксный поиск без учёта регистра (istartswith): PostgreSQL сравнивает
+# UPPER(name) LIKE UPPER(%s), SQLite - LIKE с регистронезависимым NOCASE.
+INGREDIENT_NAME_INDEX = {
+    'postgresql': (
+        'CREATE INDEX ingredient_name_upper_prefix_idx '
+        'ON recipes_ingredient (UPPER(name) text_pattern_ops)'
+    ),
+    'sqlite': (
+        'CREATE INDEX ingredient_name_upper_prefix_idx '
+        'ON recipes_ingredient (name COLLATE NOCASE)'
+    ),
+}
+
+DROP_INGREDIENT_NAME_INDEX = {
+    vendor: 'DROP INDEX ingredient_name_upper_prefix_idx'
+    for vendor in INGREDIENT_NAME_INDEX
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taginrecipe',
+            index=models.Index(fields=['recipe', 'tag'], name='taginrecipe_recipe_tag_idx'),
+        ),
+        migrations.RunPython(
+            run(INGREDIENT_NAME_INDEX), run(DROP_INGREDIENT_NAME_INDEX)
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Фото взято в обработку'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+import re
+
+from django.db import connection
+from django.db.models import (
+    BooleanField, Exists, FloatField, OuterRef, Q, Value
+)
+from django.db.models.expressions import RawSQL
+
+from .models import IngredientInRecipe
+
+WORD_RE = re.compile(r'\w+')
+
+
+class SearchBackend:
+    """Полнотекстовый поиск рецептов по названию, описанию и ингредиентам.
+
+    search() возвращает отфильтрованный queryset с аннотацией search_rank:
+    чем больше значение, тем выше рецепт в выдаче.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def ordered(self, queryset):
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+
+class PostgresSearchBackend(SearchBackend):
+    query_sql = "websearch_to_tsquery('russian', %s)"
+
+    def search(self, queryset, query):
+        return self.ordered(queryset.annotate(
+            search_match=RawSQL(
+                f'recipes_recipe.search_vector @@ {self.query_sql}',
+                (query,),
+                output_field=BooleanField()
+            ),
+            search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {self.query_sql})',
+                (query,),
+                output_field=FloatField()
+            ),
+        ).filter(search_match=True))
+
+
+class SqliteSearchBackend(SearchBackend):
+
+    @staticmethod
+    def match_expression(query):
+        return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        # Ранг считается коррелированным подзапросом, поэтому сначала
+        # выборка сужается до совпавших рецептов одним MATCH.
+        return self.ordered(queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM recipes_recipe_fts '
+            'WHERE recipes_recipe_fts MATCH %s',
+            (expression,)
+        )).annotate(
+            search_rank=RawSQL(
+                'SELECT -bm25(recipes_recipe_fts) FROM recipes_recipe_fts '
+                'WHERE recipes_recipe_fts MATCH %s '
+                'AND recipes_recipe_fts.rowid = recipes_recipe.id',
+                (expression,),
+                output_field=FloatField()
+            ),
+        ))
+
+
+class ContainsSearchBackend(SearchBackend):
+
+    def search(self, queryset, query):
+        return self.ordered(queryset.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | Exists(IngredientInRecipe.objects.filter(
+                recipe=OuterRef('pk'), ingredient__name__icontains=query
+            ))
+        ).annotate(search_rank=Value(0.0)))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+def get_search_backend():
+    return BACKENDS.get(connection.vendor, ContainsSearchBackend)()
@@ -0,0 +1,141 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+ON_CONFLICT_SQL = (
+    ' ON CONFLICT (user_id, ingredient_id) '
+    'DO UPDATE SET amount = {items}.amount + EXCLUDED.amount'
+)
+
+USER_UPSERT_SQL = (
+    'INSERT INTO {items} (user_id, ingredient_id, amount) '
+    'SELECT %s, ingredient_id, %s * SUM(amount) FROM {links} '
+    'WHERE recipe_id IN ({ids}) GROUP BY ingredient_id'
+) + ON_CONFLICT_SQL
+
+CARTS_UPSERT_SQL = (
+    'INSERT INTO {items} (user_id, ingredient_id, amount) '
+    'SELECT cart.user_id, delta.ingredient_id, delta.amount '
+    'FROM {carts} cart CROSS JOIN ({deltas}) delta '
+    'WHERE cart.recipe_id = %s'
+) + ON_CONFLICT_SQL
+
+DELTA_SQL = 'SELECT %s AS ingredient_id, %s AS amount'
+
+USER_CLEANUP_SQL = 'DELETE FROM {items} WHERE amount <= 0 AND user_id = %s'
+
+CARTS_CLEANUP_SQL = (
+    'DELETE FROM {items} WHERE amount <= 0 AND user_id IN '
+    '(SELECT user_id FROM {carts} WHERE recipe_id = %s)'
+)
+
+
+def execute(sql, params, **parts):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(
+                items=quote(ShoppingListItem._meta.db_table),
+                links=quote(IngredientInRecipe._meta.db_table),
+                carts=quote(ShoppingCart._meta.db_table),
+                **parts,
+            ),
+            params
+        )
+
+
+def apply_recipes(user_id, recipe_ids, sign):
+    """Прибавляет (sign=1) или вычитает (sign=-1) ингредиенты рецептов
+    из списка покупок пользователя."""
+    if not recipe_ids:
+        return
+    execute(
+        USER_UPSERT_SQL,
+        [user_id, sign, *recipe_ids],
+        ids=', '.join(['%s'] * len(recipe_ids))
+    )
+    if sign < 0:
+        execute(USER_CLEANUP_SQL, [user_id])
+
+
+def apply_recipe_changes(recipe_id, deltas):
+    """Переносит изменения ингредиентов рецепта в списки покупок всех
+    пользователей, у которых он в корзине.
+
+    deltas - {id ингредиента: изменение количества}.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not deltas:
+        return
+    execute(
+        CARTS_UPSERT_SQL,
+        [*(value for item in deltas.items() for value in item), recipe_id],
+        deltas=' UNION ALL '.join([DELTA_SQL] * len(deltas))
+    )
+    if any(delta < 0 for delta in deltas.values()):
+        execute(CARTS_CLEANUP_SQL, [recipe_id])
+
+
+def apply_link_change(old, new):
+    """Учитывает изменение одной строки IngredientInRecipe (old и new -
+    состояния до и после, None для создания и удаления)."""
+    changes = {}
+    if old is not None:
+        changes.setdefault(old.recipe_id, Counter())[
+            old.ingredient_id
+        ] -= old.amount
+    if new is not None:
+        changes.setdefault(new.recipe_id, Counter())[
+            new.ingredient_id
+        ] += new.amount
+    for recipe_id, deltas in changes.items():
+        apply_recipe_changes(recipe_id, deltas)
+
+
+def expected_items(user_id):
+    return dict(
+        IngredientInRecipe.objects.filter(
+            recipe__shopping_cart__user_id=user_id
+        ).values('ingredient_id').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient_id', 'total')
+    )
+
+
+def rebuild(fix=True):
+    """Сверяет списки покупок с корзинами и пересобирает разошедшиеся.
+
+    Возвращает количество пользователей с расхождениями.
+    """
+    user_ids = ShoppingCart.objects.values_list('user_id', flat=True).union(
+        ShoppingListItem.objects.values_list('user_id', flat=True)
+    )
+    drifted = 0
+    for user_id in list(user_ids):
+        expected = expected_items(user_id)
+        actual = dict(
+            ShoppingListItem.objects.filter(
+                user_id=user_id, amount__gt=0
+            ).values_list('ingredient_id', 'amount')
+        )
+        if expected == actual:
+            continue
+        drifted += 1
+        if fix:
+            with transaction.atomic():
+                ShoppingListItem.objects.filter(user_id=user_id).delete()
+                ShoppingListItem.objects.bulk_create([
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount
+                    )
+                    for ingredient_id, amount in expected.items()
+                ])
+    return drifted
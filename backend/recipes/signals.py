@@ -0,0 +1,176 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.utils import timezone
+
+from users.models import Subscription, User
+
+from . import feed, shopping_lists, user_sets, versions
+from .counters import COUNTERS, change_counter
+from .models import (
+    Favourite, Ingredient, IngredientInRecipe, Recipe, ShoppingCart, Tag,
+    TagInRecipe
+)
+
+
+def counter_receivers(counter):
+
+    def on_save(sender, instance, created, **kwargs):
+        if created:
+            change_counter(counter, instance, 1)
+
+    def on_delete(sender, instance, **kwargs):
+        change_counter(counter, instance, -1)
+
+    return on_save, on_delete
+
+
+def connect_counters():
+    for counter in COUNTERS:
+        on_save, on_delete = counter_receivers(counter)
+        uid = f'{counter.target.__name__}.{counter.field}'
+        post_save.connect(
+            on_save, sender=counter.source, weak=False, dispatch_uid=uid
+        )
+        post_delete.connect(
+            on_delete, sender=counter.source, weak=False, dispatch_uid=uid
+        )
+
+
+PUBLIC_USER_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def table_receiver(name):
+
+    def receiver(sender, **kwargs):
+        versions.bump_on_commit(name)
+
+    return receiver
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or PUBLIC_USER_FIELDS & set(update_fields):
+        versions.bump_on_commit('users')
+        versions.bump_on_commit(f'author:{instance.pk}')
+
+
+def user_state_changed(sender, instance, **kwargs):
+    versions.bump_on_commit(f'user:{instance.user_id}')
+
+
+def touch(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    versions.bump('recipes')
+
+
+def touch_recipes(recipe_ids):
+    """Новая дата изменения рецептов, у которых поменялись теги или
+    ингредиенты: от неё зависят ETag и ключи фрагментов рецептов.
+
+    Один запрос на транзакцию, после её фиксации. RecipeWriteSerializer
+    меняет теги и ингредиенты запросами без сигналов и сам сохраняет
+    рецепт, поэтому сюда не попадает.
+    """
+    versions.on_commit_once('touch_recipes', touch, recipe_ids)
+
+
+def recipe_part_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch_recipes([instance.recipe_id])
+
+
+def recipe_parts_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_recipes([instance.pk])
+    elif action == 'pre_clear':
+        touch_recipes(list(instance.recipes.values_list('pk', flat=True)))
+    else:
+        touch_recipes(pk_set)
+
+
+def connect_versions():
+    for model, name in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+        receiver = table_receiver(name)
+        post_save.connect(receiver, sender=model, weak=False)
+        post_delete.connect(receiver, sender=model, weak=False)
+    post_save.connect(user_changed, sender=User)
+    post_delete.connect(user_changed, sender=User)
+    receiver = table_receiver('recipes')
+    post_save.connect(receiver, sender=Recipe, weak=False)
+    post_delete.connect(receiver, sender=Recipe, weak=False)
+    for model in (Favourite, ShoppingCart, Subscription):
+        post_save.connect(user_state_changed, sender=model)
+        post_delete.connect(user_state_changed, sender=model)
+    for model in (IngredientInRecipe, TagInRecipe):
+        # Без post_delete: с ним удаление через QuerySet шло бы по строке.
+        post_save.connect(recipe_part_saved, sender=model)
+        m2m_changed.connect(recipe_parts_changed, sender=model)
+
+
+def user_set_saved(sender, instance, created, **kwargs):
+    if created:
+        user_sets.change(instance.user_id)
+
+
+def user_set_deleted(sender, instance, **kwargs):
+    user_sets.change(instance.user_id)
+
+
+def connect_user_sets():
+    for model in user_sets.KINDS:
+        uid = f'user_sets.{model.__name__}'
+        post_save.connect(user_set_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(user_set_deleted, sender=model, dispatch_uid=uid)
+
+
+def cart_added(sender, instance, created, **kwargs):
+    if created:
+        shopping_lists.apply_recipes(
+            instance.user_id, [instance.recipe_id], 1
+        )
+
+
+def cart_removed(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении рецепта его ингредиенты ещё
+    # на месте.
+    shopping_lists.apply_recipes(instance.user_id, [instance.recipe_id], -1)
+
+
+def connect_shopping_lists():
+    post_save.connect(
+        cart_added, sender=ShoppingCart, dispatch_uid='shopping_lists'
+    )
+    pre_delete.connect(
+        cart_removed, sender=ShoppingCart, dispatch_uid='shopping_lists'
+    )
+
+
+def recipe_publishing(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        instance.fanned_out = feed.should_fan_out(instance.author)
+
+
+def recipe_published(sender, instance, created, raw=False, **kwargs):
+    if created and instance.fanned_out and not raw:
+        feed.fan_out(instance)
+
+
+def subscribed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+def unsubscribed(sender, instance, **kwargs):
+    feed.forget(instance.user_id, instance.author_id)
+
+
+def connect_feed():
+    pre_save.connect(recipe_publishing, sender=Recipe, dispatch_uid='feed')
+    post_save.connect(recipe_published, sender=Recipe, dispatch_uid='feed')
+    post_save.connect(subscribed, sender=Subscription, dispatch_uid='feed')
+    post_delete.connect(
+        unsubscribed, sender=Subscription, dispatch_uid='feed'
+    )
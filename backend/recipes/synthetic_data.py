@@ -0,0 +1,284 @@
+import io
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image
+
+from users.models import Subscription, User
+
+from . import shopping_lists, versions
+from .counters import COUNTERS, reconcile
+from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCart, Tag, TagInRecipe, TimelineEntry)
+
+DEFAULT_PASSWORD = 'foodgram-fixtures'
+USERNAME_PREFIX = 'fixture_user'
+IMAGE_NAME = 'recipes/image/fixture.jpg'
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+    ('Выпечка', '#C0712F', 'bakery'),
+    ('Салат', '#6FCF97', 'salad'),
+    ('Суп', '#EB5757', 'soup'),
+    ('Напиток', '#2D9CDB', 'drink'),
+)
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Запеканка', 'Пирог', 'Омлет', 'Каша',
+    'Паста', 'Плов', 'Смузи', 'Оладьи', 'Котлеты', 'Жаркое', 'Десерт',
+)
+STYLES = (
+    'по-домашнему', 'быстрый', 'праздничный', 'летний', 'зимний',
+    'бабушкин', 'постный', 'острый', 'лёгкий', 'сытный',
+)
+
+# Число связей на пользователя или рецепт: (минимум, максимум).
+INGREDIENTS_PER_RECIPE = (3, 15)
+TAGS_PER_RECIPE = (1, 3)
+SUBSCRIPTIONS_PER_USER = (0, 40)
+FAVORITES_PER_USER = (0, 60)
+CART_PER_USER = (0, 8)
+# Показатель степенного распределения популярности: чем больше, тем
+# сильнее перекос в пользу первых элементов.
+SKEW = 1.1
+HISTORY_DAYS = 365
+
+FAN_OUT_RANGE_SQL = (
+    'INSERT INTO {timeline} (user_id, recipe_id) '
+    'SELECT subscription.user_id, recipe.id FROM {recipes} recipe '
+    'JOIN {subscriptions} subscription '
+    'ON subscription.author_id = recipe.author_id '
+    'WHERE recipe.fanned_out AND recipe.id BETWEEN %s AND %s '
+    'ON CONFLICT (user_id, recipe_id) DO NOTHING'
+)
+
+
+class Skewed:
+    """Выборка с популярностью по закону Ципфа.
+
+    Несколько элементов встречаются очень часто, большинство - редко,
+    как авторы, рецепты и ингредиенты на настоящем сайте.
+    """
+
+    def __init__(self, rng, items, skew=SKEW):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(self.items) + 1)
+        ))
+
+    def one(self):
+        return self.items[bisect(
+            self.weights, self.rng.random() * self.weights[-1]
+        )]
+
+    def sample(self, bounds, exclude=None):
+        """Разные элементы в количестве от bounds[0] до bounds[1]."""
+        size = min(self.rng.randint(*bounds), len(self.items))
+        chosen = set()
+        for _ in range(size * 4):
+            if len(chosen) >= size:
+                break
+            item = self.one()
+            if item != exclude:
+                chosen.add(item)
+        return chosen
+
+
+def fixture_image():
+    if not default_storage.exists(IMAGE_NAME):
+        buffer = io.BytesIO()
+        Image.new('RGB', (960, 720), '#E26C2D').save(buffer, 'JPEG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return IMAGE_NAME
+
+
+def ensure_tags():
+    Tag.objects.bulk_create(
+        [Tag(name=name, color=color, slug=slug) for name, color, slug in TAGS],
+        ignore_conflicts=True
+    )
+    return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+
+def create_users(count, password, batch_size):
+    start = User.objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ).count()
+    password = make_password(password)
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(start, start + count)
+        ],
+        batch_size=batch_size
+    )
+    return [user.pk for user in users]
+
+
+def create_recipes(rng, count, authors, ingredients, batch_size):
+    """Рецепты с датами публикации за последний год, от старых к новым."""
+    image = fixture_image()
+    names = dict(Ingredient.objects.values_list('id', 'name'))
+    now = timezone.now()
+    dates = sorted(
+        now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 60 * 60))
+        for _ in range(count)
+    )
+    recipes, links = [], []
+    for pub_date in dates:
+        ingredient_ids = sorted(ingredients.sample(INGREDIENTS_PER_RECIPE))
+        main = names[rng.choice(ingredient_ids)]
+        recipes.append(Recipe(
+            name=f'{rng.choice(DISHES)} {rng.choice(STYLES)}: {main}'[:200],
+            author_id=authors.one(),
+            text='Понадобится: ' + ', '.join(
+                names[pk] for pk in ingredient_ids
+            ) + '.',
+            image=image,
+            cooking_time=rng.randint(5, 180),
+            renditions_pending=False,
+        ))
+        links.append(ingredient_ids)
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+    # auto_now_add перезаписывает дату при создании, поэтому настоящие
+    # даты публикации проставляются отдельным обновлением.
+    for recipe, pub_date in zip(recipes, dates):
+        recipe.pub_date = recipe.updated_at = pub_date
+    Recipe.objects.bulk_update(
+        recipes, ['pub_date', 'updated_at'], batch_size=batch_size
+    )
+    return {
+        recipe.pk: ingredient_ids
+        for recipe, ingredient_ids in zip(recipes, links)
+    }
+
+
+def create_links(rng, recipes, tags, batch_size):
+    IngredientInRecipe.objects.bulk_create(
+        (
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id, ingredient_ids in recipes.items()
+            for ingredient_id in ingredient_ids
+        ),
+        batch_size=batch_size
+    )
+    TagInRecipe.objects.bulk_create(
+        (
+            TagInRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipes
+            for tag_id in tags.sample(TAGS_PER_RECIPE)
+        ),
+        batch_size=batch_size
+    )
+
+
+def create_user_links(users, authors, recipes, batch_size):
+    """Подписки, избранное и корзины; возвращает корзины пользователей."""
+    Subscription.objects.bulk_create(
+        (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in users
+            for author_id in authors.sample(
+                SUBSCRIPTIONS_PER_USER, exclude=user_id
+            )
+        ),
+        batch_size=batch_size
+    )
+    Favourite.objects.bulk_create(
+        (
+            Favourite(user_id=user_id, recipe_id=recipe_id)
+            for user_id in users
+            for recipe_id in recipes.sample(FAVORITES_PER_USER)
+        ),
+        batch_size=batch_size
+    )
+    carts = {user_id: recipes.sample(CART_PER_USER) for user_id in users}
+    ShoppingCart.objects.bulk_create(
+        (
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_ids in carts.items()
+            for recipe_id in recipe_ids
+        ),
+        batch_size=batch_size
+    )
+    return carts
+
+
+def fill_timelines(recipe_ids):
+    """То же, что сделала бы рассылка при публикации каждого рецепта."""
+    first, last = min(recipe_ids), max(recipe_ids)
+    Recipe.objects.filter(
+        pk__range=(first, last),
+        author__subscribers_count__lte=settings.FEED_FAN_OUT_THRESHOLD
+    ).update(fanned_out=True)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            FAN_OUT_RANGE_SQL.format(
+                timeline=quote(TimelineEntry._meta.db_table),
+                recipes=quote(Recipe._meta.db_table),
+                subscriptions=quote(Subscription._meta.db_table),
+            ),
+            [first, last]
+        )
+
+
+def generate(users, recipes, seed=None, password=DEFAULT_PASSWORD,
+             batch_size=1000):
+    """Создаёт пользователей и рецепты со связями.
+
+    Записи создаются пакетно, без сигналов, поэтому денормализованные
+    данные (счётчики, ленты, списки покупок) досчитываются в конце так
+    же, как их поддерживает приложение. Вызывать в транзакции.
+    """
+    rng = random.Random(seed)
+    ingredients = Skewed(rng, Ingredient.objects.order_by('id').values_list(
+        'id', flat=True
+    ))
+    tags = Skewed(rng, ensure_tags())
+    user_ids = create_users(users, password, batch_size)
+    authors = Skewed(rng, user_ids)
+    created = create_recipes(rng, recipes, authors, ingredients, batch_size)
+    create_links(rng, created, tags, batch_size)
+    carts = create_user_links(
+        user_ids, authors, Skewed(rng, created), batch_size
+    )
+    for counter in COUNTERS:
+        reconcile(counter)
+    if created:
+        fill_timelines(list(created))
+    for user_id, recipe_ids in carts.items():
+        shopping_lists.apply_recipes(user_id, list(recipe_ids), 1)
+    versions.bump('recipes', 'tags', 'ingredients', 'users')
+    return {
+        'users': len(user_ids),
+        'recipes': len(created),
+        'ingredient_links': sum(map(len, created.values())),
+        'subscriptions': Subscription.objects.filter(
+            user_id__in=user_ids
+        ).count(),
+        'favorites': Favourite.objects.filter(user_id__in=user_ids).count(),
+        'cart_items': sum(map(len, carts.values())),
+    }
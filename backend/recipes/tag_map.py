@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import versions
+from .models import Tag
+
+
+class TagMap:
+    """slug -> id тегов в памяти процесса.
+
+    Перечитывается с основной базы, когда меняется отметка версии 'tags',
+    и не реже раза в TAG_MAP_TTL секунд - на случай изменений в обход
+    моделей.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.built_at = 0.0
+        self.ids = {}
+
+    def is_stale(self, version):
+        return (
+            version != self.version
+            or time.monotonic() - self.built_at > settings.TAG_MAP_TTL
+        )
+
+    def ensure_fresh(self):
+        version = versions.get('tags')
+        if self.is_stale(version):
+            with self.lock:
+                if self.is_stale(version):
+                    self.ids = dict(Tag.objects.using(
+                        DEFAULT_DB_ALIAS
+                    ).values_list('slug', 'id'))
+                    self.version = version
+                    self.built_at = time.monotonic()
+        return self.ids
+
+    def choices(self):
+        return [(slug, slug) for slug in sorted(self.ensure_fresh())]
+
+    def ids_for(self, slugs):
+        ids = self.ensure_fresh()
+        return [ids[slug] for slug in slugs if slug in ids]
+
+
+tag_map = TagMap()
@@ -0,0 +1,61 @@
+from django.db import connection, transaction
+
+from . import shopping_lists, user_sets, versions
+from .counters import change_counters, counter_for
+from .models import Recipe, ShoppingCart
+
+ADD_SQL = (
+    'INSERT INTO {table} (user_id, recipe_id) '
+    'SELECT %s, id FROM {recipes} WHERE id IN ({ids}) '
+    'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+    'RETURNING recipe_id'
+)
+
+REMOVE_SQL = (
+    'DELETE FROM {table} WHERE user_id = %s AND recipe_id IN ({ids}) '
+    'RETURNING recipe_id'
+)
+
+
+def execute(sql, model, user, recipe_ids):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(
+                table=quote(model._meta.db_table),
+                recipes=quote(Recipe._meta.db_table),
+                ids=', '.join(['%s'] * len(recipe_ids)),
+            ),
+            [user.pk, *recipe_ids]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+@transaction.atomic
+def change_user_recipes(sql, model, user, recipe_ids, delta):
+    """Добавляет или убирает рецепты из избранного или списка покупок.
+
+    Одним запросом, опираясь на уникальное ограничение (user, recipe):
+    повторы и несуществующие рецепты пропускаются без ошибок. Возвращает
+    id рецептов, которые действительно изменились; счётчики и отметка
+    версии пользователя обновляются только для них.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return []
+    changed = execute(sql, model, user, recipe_ids)
+    if changed:
+        change_counters(counter_for(model), changed, delta)
+        versions.bump_on_commit(f'user:{user.pk}')
+        user_sets.change(user.pk)
+        if model is ShoppingCart:
+            shopping_lists.apply_recipes(user.pk, changed, delta)
+    return changed
+
+
+def add_recipes(model, user, recipe_ids):
+    return change_user_recipes(ADD_SQL, model, user, recipe_ids, 1)
+
+
+def remove_recipes(model, user, recipe_ids):
+    return change_user_recipes(REMOVE_SQL, model, user, recipe_ids, -1)
@@ -0,0 +1,134 @@
+import time
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import CharField, Value
+
+from users.models import Subscription
+
+from .models import Favourite, ShoppingCart
+
+CACHE_ALIAS = 'user_sets'
+STATS_KEYS = {'hits': 'stats:hits', 'misses': 'stats:misses'}
+
+SOURCES = {
+    'favorites': (Favourite, 'recipe_id'),
+    'cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+KINDS = {model: kind for kind, (model, field) in SOURCES.items()}
+
+
+class UserSets:
+    """id избранных рецептов, рецептов в корзине и авторов в подписках."""
+
+    def __init__(self, favorites=frozenset(), cart=frozenset(),
+                 subscriptions=frozenset()):
+        self.favorites = favorites
+        self.cart = cart
+        self.subscriptions = subscriptions
+
+
+EMPTY = UserSets()
+
+
+def cache():
+    return caches[CACHE_ALIAS]
+
+
+def make_key(user_id, generation, kind):
+    return f'{user_id}:{generation}:{kind}'
+
+
+def generation_key(user_id):
+    return f'{user_id}:generation'
+
+
+def generation(user_id):
+    """Поколение множеств пользователя, меняется после каждой записи.
+
+    Начальное значение - время, а не 0: если ключ вытеснят из кэша,
+    новое поколение не совпадёт ни с одним прежним.
+    """
+    key = generation_key(user_id)
+    value = cache().get(key)
+    if value is None:
+        cache().add(key, time.time_ns(), None)
+        return cache().get(key)
+    return value
+
+
+def next_generation(user_id):
+    key = generation_key(user_id)
+    try:
+        cache().incr(key)
+    except ValueError:
+        cache().add(key, time.time_ns(), None)
+
+
+def load(user_id, kinds):
+    """Множества kinds пользователя одним запросом."""
+    # Множество живёт в кэше долго, поэтому читается с основной базы,
+    # а не с реплики, которая может отставать.
+    querysets = [
+        model.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).annotate(
+            kind=Value(kind, output_field=CharField())
+        ).order_by().values_list(field, 'kind')
+        for kind, (model, field) in SOURCES.items() if kind in kinds
+    ]
+    sets = {kind: set() for kind in kinds}
+    for pk, kind in querysets[0].union(*querysets[1:], all=True):
+        sets[kind].add(pk)
+    return {kind: frozenset(ids) for kind, ids in sets.items()}
+
+
+def count(name, delta):
+    if not delta:
+        return
+    key = STATS_KEYS[name]
+    try:
+        cache().incr(key, delta)
+    except ValueError:
+        cache().add(key, 0, None)
+        cache().incr(key, delta)
+
+
+def get(user):
+    if not user.is_authenticated:
+        return EMPTY
+    current = generation(user.pk)
+    keys = {make_key(user.pk, current, kind): kind for kind in SOURCES}
+    found = cache().get_many(keys)
+    sets = {kind: found[key] for key, kind in keys.items() if key in found}
+    missing = [kind for key, kind in keys.items() if key not in found]
+    if missing:
+        loaded = load(user.pk, missing)
+        cache().set_many({
+            make_key(user.pk, current, kind): ids
+            for kind, ids in loaded.items()
+        })
+        sets.update(loaded)
+    count('hits', len(found))
+    count('misses', len(missing))
+    return UserSets(**sets)
+
+
+def change(user_id):
+    """Начинает новое поколение множеств пользователя после фиксации
+    транзакции.
+
+    Множества не дописываются на месте и не удаляются: чтение, начатое
+    до записи, положило бы в кэш старые множества уже после удаления.
+    Прочитанное до записи ляжет под старым поколением, которое больше
+    никто не читает.
+    """
+    transaction.on_commit(lambda: next_generation(user_id))
+
+
+def stats():
+    found = cache().get_many(STATS_KEYS.values())
+    return {name: found.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def reset_stats():
+    cache().delete_many(STATS_KEYS.values())
@@ -0,0 +1,101 @@
+import time
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Version
+
+# Отметки, уже прочитанные в текущем запросе: фильтры и представления
+# спрашивают их по нескольку раз. Общий словарь, а не значение, чтобы
+# его дополняли и потоки sync_to_async.
+request_stamps = ContextVar('request_stamps', default=None)
+
+
+def versions():
+    # Отметки читаются с основной базы: реплика может ещё не знать
+    # о только что поднятой версии.
+    return Version.objects.using(DEFAULT_DB_ALIAS)
+
+
+def bump(*names):
+    stamp = time.time()
+    versions().bulk_create(
+        [Version(name=name, stamp=stamp) for name in names],
+        update_conflicts=True, unique_fields=['name'], update_fields=['stamp']
+    )
+    stamps = request_stamps.get()
+    if stamps is not None:
+        stamps.update(dict.fromkeys(names, stamp))
+    return stamp
+
+
+class Pending:
+    """Действие после фиксации транзакции со всеми накопленными в ней
+    аргументами."""
+
+    def __init__(self, key, action):
+        self.key = key
+        self.action = action
+        self.items = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        self.action(self.items)
+
+
+def on_commit_once(key, action, items):
+    """Выполняет action(items) после фиксации транзакции, один раз на
+    блок atomic для каждого key; вне транзакции - сразу.
+
+    Сигналы приходят по каждой строке, а запрос нужен один.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        action(set(items))
+        return
+    # Действие ищется только среди отложенных на том же уровне
+    # вложенности atomic: откат точки сохранения отменяет его вместе
+    # с её изменениями.
+    savepoints = set(connection.savepoint_ids)
+    for sids, callback, robust in connection.run_on_commit:
+        if (
+            sids == savepoints and isinstance(callback, Pending)
+            and callback.key == key and not callback.done
+        ):
+            break
+    else:
+        callback = Pending(key, action)
+        transaction.on_commit(callback)
+    callback.items.update(items)
+
+
+def bump_on_commit(*names):
+    on_commit_once('versions', lambda pending: bump(*pending), names)
+
+
+def get(name):
+    return get_many(name)[name]
+
+
+def read(names):
+    found = dict(
+        versions().filter(name__in=names).values_list('name', 'stamp')
+    )
+    return {name: found.get(name, 0) for name in names}
+
+
+def get_many(*names):
+    """Отметки по именам, не больше одного запроса; у имени, которое ещё
+    ни разу не поднималось, отметка 0.
+
+    В запросе отметка читается из базы один раз, см.
+    api.middleware.VersionStampsMiddleware.
+    """
+    stamps = request_stamps.get()
+    if stamps is None:
+        return read(names)
+    missing = [name for name in names if name not in stamps]
+    if missing:
+        stamps.update(read(missing))
+    return {name: stamps[name] for name in names}
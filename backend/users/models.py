@@ -3,18 +3,53 @@ from django.db import models
 from django.db.models import UniqueConstraint
 
 
-class User(AbstractUser):
+class CountersModel(models.Model):
+    """Модель с денормализованными счётчиками counter_fields.
+
+    Счётчики меняются только F()-обновлениями, поэтому обычный save()
+    существующей записи их не записывает: иначе устаревший экземпляр
+    затёр бы текущие значения. Записать их можно, явно перечислив в
+    update_fields.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class User(CountersModel, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',
         'first_name',
         'last_name',
     ]
+    counter_fields = ('recipes_count', 'subscribers_count')
     email = models.EmailField(
         max_length=254,
         unique=True,
         verbose_name='Электронная почта',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков',
+    )
 
     class Meta:
         ordering = ['id']
@@ -1,4 +1,8 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -6,18 +10,39 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.fast_serializers import (
+    FastListMixin, FastSubscriptionSerializer, FastUserSerializer
+)
 from api.paginators import CustomPagination
 from api.serializers import CustomUserSerializer, SubscribeSerializer
+from api.utils import get_recipes_limit
+from recipes.models import Recipe
 
 from .models import Subscription
 
 User = get_user_model()
 
 
-class SubscriptionsHandlingUserViewSet(UserViewSet):
+class SubscriptionsHandlingUserViewSet(FastListMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     pagination_class = CustomPagination
+    query_budgets = {'list': 3, 'retrieve': 2, 'subscriptions': 4}
+    replica_actions = ('list', 'retrieve')
+    cursor_ordering = ('id',)
+    fast_serializers = {
+        'list': FastUserSerializer,
+        'subscriptions': FastSubscriptionSerializer,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(is_subscribed=Value(False))
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))
+        ))
 
     @action(
         detail=True,
@@ -36,7 +61,8 @@ class SubscriptionsHandlingUserViewSet(UserViewSet):
                 context={"request": request}
             )
             serializer.is_valid(raise_exception=True)
-            Subscription.objects.create(user=user, author=author)
+            with transaction.atomic():
+                Subscription.objects.create(user=user, author=author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         subscription = get_object_or_404(
             Subscription,
@@ -52,11 +78,25 @@ class SubscriptionsHandlingUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        limit = get_recipes_limit(request)
+        queryset = User.objects.filter(
+            subscribing__user=user
+        ).annotate(is_subscribed=Value(True))
         pages = self.paginate_queryset(queryset)
+        if self.fast_serializer_class is not None:
+            serializer = self.get_serializer(pages, many=True, context={
+                'request': request, 'recipes_limit': limit
+            })
+            return self.get_paginated_response(serializer.data)
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(pages, limit):
+            recipes_by_author[recipe.author_id].append(recipe)
         serializer = SubscribeSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={
+                'request': request,
+                'recipes_by_author': recipes_by_author,
+            }
         )
         return self.get_paginated_response(serializer.data)